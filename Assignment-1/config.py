@@ -3,6 +3,16 @@ from pathlib import Path
 
 RANDOM_SEED = 42
 
+# Sample sizes of the diameter estimates, all taken from one nested sample of sources
+DIAMETER_SAMPLES = [10, 100, 1000]
+# Number of processes running BFS, all cores by default
+WORKERS = os.cpu_count() or 1
+
+# Also estimate the distance distribution of all pairs with HyperANF, using 2^HYPERANF_PRECISION
+# registers (and 2^(HYPERANF_PRECISION + 1) bytes, 64 at 5) per node
+HYPERANF = False
+HYPERANF_PRECISION = 5
+
 DATASET_PATH = Path("./SNAP-DATA")
 SUBGRAPH_PATH = Path("./subgraphs")
 PLOT_PATH = Path("./plots")
@@ -19,6 +29,10 @@ if not os.path.exists(PLOT_PATH):
 
 CONFIG = {
     'RANDOM_SEED': RANDOM_SEED,
+    'DIAMETER_SAMPLES': DIAMETER_SAMPLES,
+    'WORKERS': WORKERS,
+    'HYPERANF': HYPERANF,
+    'HYPERANF_PRECISION': HYPERANF_PRECISION,
     'DATASET_PATH': DATASET_PATH,
     'SUBGRAPH_PATH': SUBGRAPH_PATH,
     'PLOT_PATH': PLOT_PATH
@@ -0,0 +1,154 @@
+import numpy as np
+
+from plots import writeGnuPlot
+
+
+def connectivity(graph, biconnected=True):
+    """
+        Connected components, bridges, articulation points and biconnected components from one DFS
+
+        Args:
+        graph (CSRGraph) -> Undirected graph
+        biconnected (bool) -> Also collect the nodes of every biconnected component
+
+        Return:
+        result (dict) ->
+            'componentSizes': number of nodes of every connected component, largest first
+            'largestFraction': fraction of nodes in the largest component (snap.GetMxSccSz)
+            'bridges': (m, 2) array of node indices of every bridge (snap.GetEdgeBridges)
+            'articulationPoints': node indices of the articulation points (snap.GetArtPoints)
+            'biconnected': list of node index arrays, one per biconnected component with at least
+                           one edge (snap.GetBiCon), only if biconnected is True
+
+        Hopcroft and Tarjan's algorithm with an explicit stack instead of recursion, so a long
+        path cannot exceed Python's recursion limit. Every node gets its discovery time and the
+        lowest discovery time reachable through its DFS subtree and one back edge. When the DFS
+        returns from child u to parent p:
+        low[u] > disc[p] makes p-u a bridge, and low[u] >= disc[p] makes p an articulation point
+        (the root only if it has two or more DFS children) and closes a biconnected component,
+        whose edges are popped from the edge stack. The graph has no repeated edges, so the edge
+        back to the parent is the only one skipped. Self loops are ignored. Every root's search
+        discovers exactly its connected component, so the component's size is the number of
+        discovery times handed out during it
+    """
+
+    n = len(graph)
+    # Python lists are much faster than NumPy arrays to index one element at a time
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+
+    disc = [-1] * n
+    low = [0] * n
+    parent = [-1] * n
+    position = indptr[:-1]
+    isArticulation = [False] * n
+    bridges = []
+    edgeSources, edgeTargets = [], []
+    # Edges of the closed biconnected components, one run of componentEdges[c] edges per component
+    closedSources, closedTargets, componentEdges = [], [], []
+    componentSizes = []
+    time = 0
+
+    for root in range(n):
+        if disc[root] != -1:
+            continue
+
+        rootChildren = 0
+        disc[root] = low[root] = time
+        time += 1
+        stack = [root]
+
+        while stack:
+            u = stack[-1]
+            if position[u] < indptr[u + 1]:
+                v = indices[position[u]]
+                position[u] += 1
+                if disc[v] == -1:
+                    parent[v] = u
+                    disc[v] = low[v] = time
+                    time += 1
+                    stack.append(v)
+                    if u == root:
+                        rootChildren += 1
+                    if biconnected:
+                        edgeSources.append(u)
+                        edgeTargets.append(v)
+                elif v != parent[u] and disc[v] < disc[u]:
+                    # Back edge to an ancestor; a self loop has disc[v] == disc[u] and is skipped
+                    if disc[v] < low[u]:
+                        low[u] = disc[v]
+                    if biconnected:
+                        edgeSources.append(u)
+                        edgeTargets.append(v)
+                continue
+
+            stack.pop()
+            p = parent[u]
+            if p == -1:
+                continue
+            if low[u] < low[p]:
+                low[p] = low[u]
+            if low[u] > disc[p]:
+                bridges.append((p, u))
+            if low[u] >= disc[p]:
+                if p != root:
+                    isArticulation[p] = True
+                if biconnected:
+                    # The component's edges are the ones pushed since the tree edge p-u
+                    start = len(edgeSources) - 1
+                    while edgeSources[start] != p or edgeTargets[start] != u:
+                        start -= 1
+                    closedSources.extend(edgeSources[start:])
+                    closedTargets.extend(edgeTargets[start:])
+                    componentEdges.append(len(edgeSources) - start)
+                    del edgeSources[start:], edgeTargets[start:]
+
+        isArticulation[root] = rootChildren > 1
+        componentSizes.append(time - disc[root])
+
+    componentSizes = np.sort(np.array(componentSizes, dtype=np.int64))[::-1]
+    result = {
+        'componentSizes': componentSizes,
+        'largestFraction': componentSizes[0] / n if n else 0.0,
+        'bridges': np.array(bridges, dtype=np.int64).reshape(-1, 2),
+        'articulationPoints': np.flatnonzero(isArticulation),
+    }
+    if biconnected:
+        result['biconnected'] = _componentNodes(closedSources, closedTargets, componentEdges, n)
+    return result
+
+
+def _componentNodes(sources, targets, componentEdges, n):
+    """
+        Sorted node indices of every biconnected component from the endpoints of its edges
+    """
+
+    if not componentEdges:
+        return []
+
+    labels = np.repeat(np.arange(len(componentEdges), dtype=np.int64), componentEdges)
+    keys = np.unique(np.concatenate((labels * n + np.array(sources, dtype=np.int64),
+                                     labels * n + np.array(targets, dtype=np.int64))))
+    splits = np.searchsorted(keys, np.arange(1, len(componentEdges)) * n)
+    return np.split(keys % n, splits)
+
+
+def plotSccDistr(graph, result, plotName, description=None):
+    """
+        Write the distribution of connected component sizes as snap.PlotSccDistr does
+
+        Args:
+        graph (CSRGraph) -> Graph the components were computed on
+        result (dict) -> Output of `connectivity`
+        plotName (str) -> Name of the plot, files are written as scc.<plotName>.{tab,plt,png}
+        description (str) -> Start of the title, plotName by default
+
+        Return:
+        None
+    """
+
+    sizes, counts = np.unique(result['componentSizes'], return_counts=True)
+    title = (f"{description or plotName}. G({len(graph)}, {graph.edgeCount}). "
+             f"Largest component has {result['largestFraction']:f} nodes")
+    writeGnuPlot(f"scc.{plotName}", title, "Size of strongly connected component", "Number of components",
+                 zip(sizes.tolist(), counts.tolist()), logScale="xy")
@@ -0,0 +1,209 @@
+import multiprocessing
+
+import numpy as np
+
+from graph import attachGraph, shareGraph
+from plots import writeGnuPlot
+
+# Graph of the BFS worker processes, set once per process by _initWorker
+_workerGraph = None
+
+
+def sampleSources(graph, sampleSize, seed):
+    """
+        Draw the BFS sources of all sample sizes at once
+
+        Args:
+        graph (CSRGraph) -> Graph to sample nodes of
+        sampleSize (int) -> Size of the largest sample
+        seed (int) -> Seed of the random permutation
+
+        Return:
+        sources (numpy.ndarray) -> Node indices of a random permutation of the nodes, cut to
+                                   sampleSize. Its first k entries are the sample of size k, so
+                                   the samples are nested as the prefixes of one shuffle, the way
+                                   GetBfsEffDiam takes the first k nodes of a shuffled node list
+    """
+
+    return np.random.default_rng(seed).permutation(len(graph))[:sampleSize]
+
+
+def distanceCounts(graph, sources, workers=1):
+    """
+        Run one BFS from every source and count the nodes at each distance
+
+        Args:
+        graph (CSRGraph) -> Graph to traverse
+        sources (numpy.ndarray) -> Node indices to start from
+        workers (int) -> Number of processes the sources are split across
+
+        Return:
+        counts (numpy.ndarray) -> int64 matrix, counts[i, h] is the number of nodes at distance h
+                                  from sources[i] (counts[i, 0] = 1 for the source itself).
+                                  Rows are padded with zeros to the largest distance seen
+    """
+
+    if workers > 1 and len(sources) > 1:
+        chunks = [chunk for chunk in np.array_split(sources, 4 * workers) if len(chunk)]
+        # A graph already in shared memory, as in a worker of scheduler.runTasks, is not copied again
+        blocks, spec = shareGraph(graph)
+        try:
+            with multiprocessing.Pool(workers, initializer=_initWorker, initargs=(spec,)) as pool:
+                rows = [row for chunkRows in pool.map(_bfsChunk, chunks) for row in chunkRows]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+    else:
+        rows = _bfsRows(graph, sources)
+
+    width = max((len(row) for row in rows), default=1)
+    counts = np.zeros((len(rows), width), dtype=np.int64)
+    for i, row in enumerate(rows):
+        counts[i, :len(row)] = row
+    return counts
+
+
+def effectiveDiameter(distribution, percentile=0.9):
+    """
+        Distance within which `percentile` of the connected pairs lie, as SNAP's CalcEffDiamPdf
+
+        Args:
+        distribution (numpy.ndarray) -> distribution[h] is the number of pairs at distance h
+        percentile (float) -> Fraction of pairs
+
+        Return:
+        effDiameter (float) -> Linearly interpolated between the two distances around the
+                               percentile in the cumulative distribution
+    """
+
+    hops = np.flatnonzero(distribution)
+    cumulative = np.cumsum(distribution[hops]).astype(np.float64)
+    effectivePairs = percentile * cumulative[-1]
+
+    above = int(np.searchsorted(cumulative, effectivePairs, side="right"))
+    if above >= len(hops):
+        return float(hops[-1])
+    if above == 0:
+        return 1.0
+
+    delta = cumulative[above] - cumulative[above - 1]
+    if delta == 0:
+        return float(hops[above])
+    return float(hops[above - 1] + (effectivePairs - cumulative[above - 1]) / delta)
+
+
+def sampledDiameters(graph, sampleSizes, seed, workers=1):
+    """
+        Full and effective diameters for several sample sizes from one set of BFS runs
+
+        Args:
+        graph (CSRGraph) -> Graph to compute diameters of
+        sampleSizes (iterable) -> Numbers of sampled source nodes, e.g. (10, 100, 1000)
+        seed (int) -> Seed of the sample
+        workers (int) -> Number of processes running BFS
+
+        Return:
+        diameters (dict) -> 'full', 'effective' and 'average' map every sample size to the full
+                            diameter, effective diameter and average shortest path length
+                            estimated from that many sources. 'distribution' is the number of
+                            (source, node) pairs at every distance over the largest sample, and
+                            'sources' the number of sources of that sample
+
+        One nested sample is drawn with `sampleSources` and every source is traversed once. The
+        estimates for a sample size k are computed from the first k rows of the distance counts,
+        so the small samples reuse the BFS runs of the large one instead of repeating them.
+        Each estimate is computed as snap.GetBfsFullDiam and snap.GetBfsEffDiam do it, counting
+        every source at distance 0 from itself. A sample larger than the graph uses all nodes
+    """
+
+    sampleSizes = sorted(set(sampleSizes))
+    sources = sampleSources(graph, sampleSizes[-1], seed)
+    counts = distanceCounts(graph, sources, workers)
+    prefixSums = np.cumsum(counts, axis=0)
+    eccentricities = np.array([np.flatnonzero(row)[-1] for row in counts])
+    hops = np.arange(counts.shape[1])
+
+    diameters = {'full': {}, 'effective': {}, 'average': {}}
+    for sampleSize in sampleSizes:
+        k = min(sampleSize, len(sources))
+        distribution = prefixSums[k - 1]
+        diameters['full'][sampleSize] = int(eccentricities[:k].max())
+        diameters['effective'][sampleSize] = effectiveDiameter(distribution)
+        diameters['average'][sampleSize] = float((hops * distribution).sum() / distribution.sum())
+
+    diameters['distribution'] = prefixSums[-1]
+    diameters['sources'] = len(sources)
+    return diameters
+
+
+def plotShortPathDistr(graph, diameters, plotName, description=None):
+    """
+        Write the shortest path length distribution as snap.PlotShortPathDistr does
+
+        Args:
+        graph (CSRGraph) -> Graph the diameters were computed on
+        diameters (dict) -> Output of `sampledDiameters`
+        plotName (str) -> Name of the plot, files are written as diam.<plotName>.{tab,plt,png}
+        description (str) -> Start of the title, plotName by default
+
+        Return:
+        None
+
+        The counts of the sampled sources are scaled by n / sources to estimate the number of
+        shortest paths over all node pairs. When every node was a source, they are exact
+    """
+
+    sampleSize = max(diameters['full'])
+    distribution = diameters['distribution'] * (len(graph) / diameters['sources'])
+    title = (f"{description or plotName}. G({len(graph)}, {graph.edgeCount}). "
+             f"Diam: avg:{diameters['average'][sampleSize]:.2f}  eff:{diameters['effective'][sampleSize]:.2f}  "
+             f"max:{diameters['full'][sampleSize]}")
+
+    hops = np.flatnonzero(distribution)
+    writeGnuPlot(f"diam.{plotName}", title, "Number of hops", "Number of shortest paths",
+                 zip(hops.tolist(), distribution[hops].tolist()), logScale="y")
+
+
+def _initWorker(spec):
+    global _workerGraph
+    _workerGraph = attachGraph(spec)
+
+
+def _bfsChunk(sources):
+    return _bfsRows(_workerGraph, sources)
+
+
+def _bfsRows(graph, sources):
+    """
+        Level-synchronous BFS from each source in turn. Returns one array of counts per
+        distance for every source
+    """
+
+    visited = np.zeros(len(graph), dtype=bool)
+    # Scratch space to drop repeated nodes from a frontier without sorting it
+    slot = np.zeros(len(graph), dtype=np.int64)
+    rows = []
+    for source in sources:
+        frontier = np.array([source])
+        visited[source] = True
+        reached = [frontier]
+        levels = [1]
+        while True:
+            neighbours = graph.expand(frontier)
+            neighbours = neighbours[~visited[neighbours]]
+            if not len(neighbours):
+                break
+            # Every repeated node keeps the last position written for it
+            positions = np.arange(len(neighbours))
+            slot[neighbours] = positions
+            frontier = neighbours[slot[neighbours] == positions]
+            visited[frontier] = True
+            reached.append(frontier)
+            levels.append(len(frontier))
+
+        # Reset only the nodes this BFS touched
+        for nodes in reached:
+            visited[nodes] = False
+        rows.append(np.array(levels, dtype=np.int64))
+    return rows
@@ -1,10 +1,19 @@
 import os
-import snap
 import sys
+import time
+
+import numpy as np
 
 from shutil import move
 from statistics import mean, pvariance
 from config import CONFIG
+from connectivity import connectivity, plotSccDistr
+from diameter import plotShortPathDistr, sampledDiameters
+from graph import loadGraph
+from hyperanf import hyperANF
+from plots import writeGnuPlot
+from scheduler import Task, runTasks
+from triangles import clusteringStatistics, plotClustCf
 
 
 def meanVariance(values):
@@ -24,100 +33,176 @@ def meanVariance(values):
 
     return (_mean, _variance)
 
-def graphStructure(elistName, elistPath):
+def sizeSection(graph, elistName, workers, inputs):
     """
-        Calculate properties of the graph as given in the assignment
-
-        Args:
-        elistName (str) -> Input elist name
-        elistPath (pathlib.Path) -> Input elist using which graph needs to be built
-
-        Return:
-        RESULTS (dict) -> Dictionary containing results for different subparts of the assignment
+        Part 1 (Size of the network)
     """
 
-    RESULTS = {}
-    subGraph = snap.LoadEdgeList(snap.PUNGraph, elistPath, 0, 1)
+    return {'nodeCount': len(graph), 'edgeCount': graph.edgeCount}
+
 
-    # Part 1 (Size of the network)
-    RESULTS['nodeCount'] = subGraph.GetNodes()
-    RESULTS['edgeCount'] = subGraph.GetEdges()
+def degreeSection(graph, elistName, workers, inputs):
+    """
+        Part 2 (Degree of nodes in the network)
+    """
 
-    # Part 2 (Degree of nodes in the network)
-    maxDegree = 0
-    maxDegreeNodes = []
-    degree7Count = 0
+    degrees = graph.degrees
+    maxDegree = int(degrees.max())
 
-    for node in subGraph.Nodes():
-        if node.GetDeg() == 7:
-            degree7Count += 1
+    # Since it is an undirected graph, in/out degree is unimportant
+    plotOutDegDistr(graph, f"deg_dist_{elistName}")
 
-        maxDegree = max(maxDegree, node.GetDeg())
+    return {
+        'maxDegree': maxDegree,
+        'maxDegreeNodes': ','.join(map(str, graph.nodeIDs[degrees == maxDegree].tolist())),
+        'degree7Count': int((degrees == 7).sum()),
+    }
 
-    for node in subGraph.Nodes():
-        if node.GetDeg() == maxDegree:
-            maxDegreeNodes.append(node.GetId())
 
-    plotFilename = f"deg_dist_{elistName}"
-    # Since it is an undirected graph, in/out degree is unimportant
-    snap.PlotOutDegDistr(subGraph, plotFilename)
+def pathSection(graph, elistName, workers, inputs):
+    """
+        Part 3 (Paths in the network)
+    """
 
-    RESULTS['maxDegree'] = maxDegree
-    RESULTS['maxDegreeNodes'] = ','.join(map(str, maxDegreeNodes))
-    RESULTS['degree7Count'] = degree7Count
+    RESULTS = {}
+    # One BFS per node of a nested sample gives the diameters of every sample size
+    diameters = sampledDiameters(graph, CONFIG['DIAMETER_SAMPLES'], CONFIG['RANDOM_SEED'], workers)
 
-    # Part 3 (Paths in the network)
     # Full Diameter Calculation
-    fullDiameters = {
-        10: snap.GetBfsFullDiam(subGraph, 10, False),
-        100: snap.GetBfsFullDiam(subGraph, 100, False),
-        1000: snap.GetBfsFullDiam(subGraph, 1000, False)
-    }
+    fullDiameters = dict(diameters['full'])
     fullMean, fullVariance = meanVariance(fullDiameters.values())
     fullDiameters['mean'] = fullMean
     fullDiameters['variance'] = fullVariance
     RESULTS['fullDiameters'] = fullDiameters
 
     # Effective Diameter Calculation
-    effDiameters = {
-        10: snap.GetBfsEffDiam(subGraph, 10, False),
-        100: snap.GetBfsEffDiam(subGraph, 100, False),
-        1000: snap.GetBfsEffDiam(subGraph, 1000, False),
-    }
+    effDiameters = dict(diameters['effective'])
     effMean, effVariance = meanVariance(effDiameters.values())
     effDiameters['mean'] = effMean
     effDiameters['variance'] = effVariance
     RESULTS['effDiameters'] = effDiameters
 
     plotFilename = f"shortest_path_{elistName}"
-    snap.PlotShortPathDistr(subGraph, plotFilename)
+    plotShortPathDistr(graph, diameters, plotFilename)
 
-    # Part 4 (Components of the network)
-    edgeBridges = snap.TIntPrV()
-    articulationPoints = snap.TIntV()
-    RESULTS['fractionLargestConnected'] = snap.GetMxSccSz(subGraph)
-    snap.GetEdgeBridges(subGraph, edgeBridges)
-    snap.GetArtPoints(subGraph, articulationPoints)
-    RESULTS['edgeBridges'] = len(edgeBridges)
-    RESULTS['articulationPoints'] = len(articulationPoints)
+    # Distance distribution of all pairs from HyperLogLog counters, for graphs too large to sample well
+    if CONFIG['HYPERANF']:
+        RESULTS['hyperANF'] = hyperANF(graph, CONFIG['HYPERANF_PRECISION'], CONFIG['RANDOM_SEED'])
+
+    return RESULTS
+
+
+def componentSection(graph, elistName, workers, inputs):
+    """
+        Part 4 (Components of the network)
+    """
+
+    # Components, bridges and articulation points all come from one depth-first search
+    components = connectivity(graph)
 
     plotFilename = f"connected_comp_{elistName}"
-    snap.PlotSccDistr(subGraph, plotFilename)
-
-    # Part 5 (Connectivity and clustering in the network)
-    RESULTS['avgClusterCoefficient'] = snap.GetClustCf(subGraph, -1)
-    RESULTS['triadCount'] = snap.GetTriadsAll(subGraph, -1)[0]
-    
-    nodeX = subGraph.GetRndNId(Rnd)
-    nodeY = subGraph.GetRndNId(Rnd)
-    RESULTS['randomClusterCoefficient'] = (nodeX, snap.GetNodeClustCf(subGraph, nodeX))
-    RESULTS['randomNodeTriads'] = (nodeY, snap.GetNodeTriads(subGraph, nodeY))
-    RESULTS['edgesTriads'] = snap.GetTriadEdges(subGraph)
+    plotSccDistr(graph, components, plotFilename)
+
+    return {
+        'fractionLargestConnected': components['largestFraction'],
+        'edgeBridges': len(components['bridges']),
+        'articulationPoints': len(components['articulationPoints']),
+        'biconnectedComponents': len(components['biconnected']),
+    }
+
+
+def clusteringSection(graph, elistName, workers, inputs):
+    """
+        Part 5 (Connectivity and clustering in the network)
+    """
+
+    # All statistics come from one pass that counts the triangles of every node
+    clustering = clusteringStatistics(graph)
+
+    nodeX, nodeY = np.random.default_rng(CONFIG['RANDOM_SEED']).choice(graph.nodeIDs, 2).tolist()
 
     plotFilename = f"clustering_coeff_{elistName}"
-    snap.PlotClustCf(subGraph, plotFilename)
+    plotClustCf(graph, clustering, plotFilename)
+
+    return {
+        'avgClusterCoefficient': clustering['avgClustCf'],
+        'triadCount': clustering['closedTriads'],
+        'randomClusterCoefficient': (nodeX, float(clustering['nodeClustCf'][graph.index(nodeX)])),
+        'randomNodeTriads': (nodeY, int(clustering['nodeTriangles'][graph.index(nodeY)])),
+        'edgesTriads': clustering['triadEdges'],
+    }
+
+
+# Parts of the report. They only read the graph, so none requires another one
+SECTIONS = {
+    'size': Task(sizeSection),
+    'degrees': Task(degreeSection),
+    'paths': Task(pathSection),
+    'components': Task(componentSection),
+    'clustering': Task(clusteringSection),
+}
+
+
+def graphStructure(elistName, elistPath, sections=None, workers=1):
+    """
+        Calculate properties of the graph as given in the assignment
+
+        Args:
+        elistName (str) -> Input elist name
+        elistPath (pathlib.Path) -> Input elist using which graph needs to be built
+        sections (list) -> Names of SECTIONS to compute, all of them by default
+        workers (int) -> Number of processes the sections are run in, nested BFS pools included
+
+        Return:
+        RESULTS (dict) -> Dictionary containing results for different subparts of the assignment
+        timings (dict) -> Seconds taken by every section, and by loading the graph
+
+        The graph is loaded once and shared read-only by all sections, which run concurrently.
+        Every section gets the number of processes it may start itself, which only the path
+        section uses: the cores left over by the other sections' processes, and its own
+    """
+
+    start = time.perf_counter()
+    graph = loadGraph(elistPath)
+    timings = {'load': time.perf_counter() - start}
+
+    sections = sections or list(SECTIONS)
+    sectionWorkers = min(workers, len(sections))
+    results, sectionTimings = runTasks(SECTIONS, sections, graph, (elistName, workers - sectionWorkers + 1),
+                                       sectionWorkers)
+    timings.update(sectionTimings)
+
+    RESULTS = {}
+    for name in SECTIONS:
+        RESULTS.update(results.get(name, {}))
+    return RESULTS, timings
+
+
+def plotOutDegDistr(graph, plotName, description=None):
+    """
+        Write the degree distribution as snap.PlotOutDegDistr does
+
+        Args:
+        graph (CSRGraph) -> Graph to plot the degrees of
+        plotName (str) -> Name of the plot, files are written as outDeg.<plotName>.{tab,plt,png}
+        description (str) -> Start of the title, plotName by default
+
+        Return:
+        None
+    """
+
+    degrees = graph.degrees
+    counts = np.bincount(degrees)
+    present = np.flatnonzero(counts)
+    averageDegree = 2 * graph.edgeCount / len(graph)
+    aboveAverage = int((degrees > averageDegree).sum())
+    aboveTwice = int((degrees > 2 * averageDegree).sum())
+    title = (f"{description or plotName}. G({len(graph)}, {graph.edgeCount}). "
+             f"{aboveAverage} ({aboveAverage / len(graph):.4f}) nodes with out-deg > avg deg ({averageDegree:.1f}), "
+             f"{aboveTwice} ({aboveTwice / len(graph):.4f}) with >2*avg.deg")
+    writeGnuPlot(f"outDeg.{plotName}", title, "Out-degree", "Count",
+                 zip(present.tolist(), counts[present].tolist()), logScale="xy")
 
-    return RESULTS
 
 def movePlots(plotPath):
     """
@@ -144,33 +229,47 @@ if __name__ == "__main__":
     if not os.path.exists(elistPath):
         raise Exception(f"The elist {elistPath} does not exist!")
 
-    # Set seed value for SNAP's random function to the value set in configuration
-    Rnd = snap.TRnd(CONFIG['RANDOM_SEED'])
-    Rnd.Randomize()
+    # Any further arguments select the sections to compute
+    sections = sys.argv[2:] or list(SECTIONS)
+    for section in sections:
+        if section not in SECTIONS:
+            raise Exception(f"Unknown section {section}, choose from {', '.join(SECTIONS)}")
 
-    RESULTS = graphStructure(elistName=elistName, elistPath=elistPath)
+    RESULTS, timings = graphStructure(elistName=elistName, elistPath=elistPath, sections=sections,
+                                      workers=CONFIG['WORKERS'])
 
     PLOT_PATH = CONFIG['PLOT_PATH']
     movePlots(PLOT_PATH)
 
     # Print all required values
-    print(f"Number of nodes: {RESULTS['nodeCount']}")
-    print(f"Number  of edges: {RESULTS['edgeCount']}")
-    print(f"Number of nodes with degree=7: {RESULTS['degree7Count']}")
-    print(f"Node id(s) with highest degree: {RESULTS['maxDegreeNodes']}")
-    print(f"Approximate full diameter by sampling 10 nodes: {RESULTS['fullDiameters'][10]}")
-    print(f"Approximate full diameter by sampling 100 nodes: {RESULTS['fullDiameters'][100]}")
-    print(f"Approximate full diameter by sampling 1000 nodes: {RESULTS['fullDiameters'][1000]}")
-    print(f"Approximate full diameter (mean and variance): {RESULTS['fullDiameters']['mean'] :.4f},{RESULTS['fullDiameters']['variance'] :.4f}")
-    print(f"Approximate effective diameter by sampling 10 nodes: {RESULTS['effDiameters'][10] :.4f}")
-    print(f"Approximate effective diameter by sampling 100 nodes: {RESULTS['effDiameters'][100] :.4f}")
-    print(f"Approximate effective diameter by sampling 1000 nodes: {RESULTS['effDiameters'][1000] :.4f}")
-    print(f"Approximate effective diameter (mean and variance): {RESULTS['effDiameters']['mean'] :.4f},{RESULTS['effDiameters']['variance'] :.4f}")
-    print(f"Fraction of nodes in largest connected component: {RESULTS['fractionLargestConnected'] :.4f}")
-    print(f"Number of edge bridges: {RESULTS['edgeBridges']}")
-    print(f"Number of articulation points: {RESULTS['articulationPoints']}")
-    print(f"Average clustering coefficient: {RESULTS['avgClusterCoefficient'] :.4f}")
-    print(f"Number of triads: {RESULTS['triadCount']}")
-    print(f"Clustering coefficient of random node {RESULTS['randomClusterCoefficient'][0]}: {RESULTS['randomClusterCoefficient'][1] :.4f}")
-    print(f"Number of triads random node {RESULTS['randomNodeTriads'][0]} participates: {RESULTS['randomNodeTriads'][1]}")
-    print(f"Number of edges that participate in at least one triad: {RESULTS['edgesTriads']}")
+    if 'size' in sections:
+        print(f"Number of nodes: {RESULTS['nodeCount']}")
+        print(f"Number  of edges: {RESULTS['edgeCount']}")
+    if 'degrees' in sections:
+        print(f"Number of nodes with degree=7: {RESULTS['degree7Count']}")
+        print(f"Node id(s) with highest degree: {RESULTS['maxDegreeNodes']}")
+    if 'paths' in sections:
+        print(f"Approximate full diameter by sampling 10 nodes: {RESULTS['fullDiameters'][10]}")
+        print(f"Approximate full diameter by sampling 100 nodes: {RESULTS['fullDiameters'][100]}")
+        print(f"Approximate full diameter by sampling 1000 nodes: {RESULTS['fullDiameters'][1000]}")
+        print(f"Approximate full diameter (mean and variance): {RESULTS['fullDiameters']['mean'] :.4f},{RESULTS['fullDiameters']['variance'] :.4f}")
+        print(f"Approximate effective diameter by sampling 10 nodes: {RESULTS['effDiameters'][10] :.4f}")
+        print(f"Approximate effective diameter by sampling 100 nodes: {RESULTS['effDiameters'][100] :.4f}")
+        print(f"Approximate effective diameter by sampling 1000 nodes: {RESULTS['effDiameters'][1000] :.4f}")
+        print(f"Approximate effective diameter (mean and variance): {RESULTS['effDiameters']['mean'] :.4f},{RESULTS['effDiameters']['variance'] :.4f}")
+    if 'hyperANF' in RESULTS:
+        print(f"HyperANF full diameter: {RESULTS['hyperANF']['full']}")
+        print(f"HyperANF effective diameter: {RESULTS['hyperANF']['effective'] :.4f}")
+        print(f"HyperANF average shortest path length: {RESULTS['hyperANF']['average'] :.4f}")
+    if 'components' in sections:
+        print(f"Fraction of nodes in largest connected component: {RESULTS['fractionLargestConnected'] :.4f}")
+        print(f"Number of edge bridges: {RESULTS['edgeBridges']}")
+        print(f"Number of articulation points: {RESULTS['articulationPoints']}")
+    if 'clustering' in sections:
+        print(f"Average clustering coefficient: {RESULTS['avgClusterCoefficient'] :.4f}")
+        print(f"Number of triads: {RESULTS['triadCount']}")
+        print(f"Clustering coefficient of random node {RESULTS['randomClusterCoefficient'][0]}: {RESULTS['randomClusterCoefficient'][1] :.4f}")
+        print(f"Number of triads random node {RESULTS['randomNodeTriads'][0]} participates: {RESULTS['randomNodeTriads'][1]}")
+        print(f"Number of edges that participate in at least one triad: {RESULTS['edgesTriads']}")
+
+    print("Time taken (seconds): " + ", ".join(f"{name} {seconds:.2f}" for name, seconds in timings.items()))
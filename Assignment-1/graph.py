@@ -0,0 +1,151 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from subgraph import readEdgeChunks
+
+
+class CSRGraph:
+    """
+        Undirected graph in compressed sparse row form, shared by the structure computations
+
+        Node i has node ID nodeIDs[i] and its neighbours are indices[indptr[i]:indptr[i + 1]],
+        sorted. Every edge is stored in both directions, a self loop once
+    """
+
+    def __init__(self, nodeIDs, indptr, indices, edgeCount):
+        self.nodeIDs = nodeIDs
+        self.indptr = indptr
+        self.indices = indices
+        self.edgeCount = edgeCount
+        # Description of the shared memory holding the arrays, if the graph was built by attachGraph
+        self.shared = None
+        self._blocks = []
+
+    def __len__(self):
+        return len(self.nodeIDs)
+
+    @property
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def index(self, nodeID):
+        """
+            Index of the node with ID nodeID
+        """
+
+        i = int(np.searchsorted(self.nodeIDs, nodeID))
+        if i == len(self.nodeIDs) or self.nodeIDs[i] != nodeID:
+            raise KeyError(nodeID)
+        return i
+
+    def expand(self, frontier):
+        """
+            Neighbours of all nodes in frontier, concatenated in the order of frontier
+
+            Args:
+            frontier (numpy.ndarray) -> Node indices
+
+            Return:
+            neighbours (numpy.ndarray) -> Node indices, with repeats
+        """
+
+        starts = self.indptr[frontier]
+        lengths = self.indptr[frontier + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=self.indices.dtype)
+
+        # Position of every neighbour in indices: its list's start plus its offset inside the list
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return self.indices[np.repeat(starts, lengths) + offsets]
+
+
+def shareGraph(graph):
+    """
+        Copy the arrays of a graph into shared memory, for worker processes to attach to
+
+        Args:
+        graph (CSRGraph) -> Graph to share
+
+        Return:
+        blocks (list) -> The new SharedMemory blocks, which the caller closes and unlinks once the
+                         workers are done. Empty if the graph already is in shared memory
+        spec (tuple) -> Names, shapes and dtypes of the blocks and the edge count, for attachGraph
+
+        Worker processes that attach to the blocks map the same pages instead of each receiving
+        a copy of the arrays, as the parallel traversal of Assignment-2 does
+    """
+
+    if graph.shared is not None:
+        return [], graph.shared
+
+    blocks, arrays = [], []
+    for array in (graph.nodeIDs, graph.indptr, graph.indices):
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        arrays.append((block.name, array.shape, array.dtype.str))
+    return blocks, (arrays, graph.edgeCount)
+
+
+def attachGraph(spec):
+    """
+        Read-only CSRGraph on the shared memory blocks described by spec, from shareGraph
+    """
+
+    arrays, edgeCount = spec
+    blocks, views = [], []
+    for name, shape, dtype in arrays:
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        view = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        view.flags.writeable = False
+        views.append(view)
+
+    graph = CSRGraph(*views, edgeCount)
+    graph.shared = spec
+    # The arrays are only valid while their blocks are open
+    graph._blocks = blocks
+    return graph
+
+
+def loadGraph(elistPath, separator='\t', chunkSize=1 << 20):
+    """
+        Load an undirected edge list into a CSRGraph
+
+        Args:
+        elistPath (str) -> Input edge list. Lines starting with # are skipped
+        separator (str) -> Column separator of the edge list
+        chunkSize (int) -> Number of lines parsed at a time
+
+        Return:
+        graph (CSRGraph) -> Graph with the nodes that appear in an edge, as snap.LoadEdgeList
+                            builds it. Repeated edges are kept once and edgeCount counts every
+                            undirected edge (self loops included) once, as GetEdges does
+    """
+
+    sources, destinations = [], []
+    for chunkSources, chunkDestinations in readEdgeChunks(elistPath, separator=separator, chunkSize=chunkSize):
+        sources.append(chunkSources)
+        destinations.append(chunkDestinations)
+    sources = np.concatenate(sources) if sources else np.empty(0, dtype=np.int64)
+    destinations = np.concatenate(destinations) if destinations else np.empty(0, dtype=np.int64)
+
+    nodeIDs, inverse = np.unique(np.concatenate((sources, destinations)), return_inverse=True)
+    n = len(nodeIDs)
+    low = np.minimum(inverse[:len(sources)], inverse[len(sources):])
+    high = np.maximum(inverse[:len(sources)], inverse[len(sources):])
+    edges = np.unique(low * n + high)
+    low, high = edges // n, edges % n
+
+    # Both directions of every edge, but a self loop only once
+    loops = low == high
+    rows = np.concatenate((low, high[~loops]))
+    columns = np.concatenate((high, low[~loops]))
+    order = np.lexsort((columns, rows))
+
+    indexType = np.int32 if n < np.iinfo(np.int32).max else np.int64
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return CSRGraph(nodeIDs, indptr, columns[order].astype(indexType), len(edges))
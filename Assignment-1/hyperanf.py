@@ -0,0 +1,149 @@
+import numpy as np
+
+from diameter import effectiveDiameter
+
+# Largest register value: the rank of a 32 bit hash remainder is at most 33
+_RANKS = 34
+
+
+def hyperANF(graph, precision=5, seed=0, maxDistance=None, blockEdges=1 << 20):
+    """
+        Approximate neighbourhood function of a graph with HyperLogLog counters (HyperANF,
+        Boldi, Rosa and Vigna, 2011)
+
+        Args:
+        graph (CSRGraph) -> Graph to compute the neighbourhood function of
+        precision (int) -> Every counter has 2^precision registers. The relative standard error of
+                           a counter is about 1.04 / sqrt(2^precision)
+        seed (int) -> Seed of the hash function
+        maxDistance (int) -> Stop after this many passes even if counters still change
+        blockEdges (int) -> Number of edges whose counters are gathered at a time
+
+        Return:
+        neighbourhood (dict) -> 'neighbourhood' is N(t), the estimated number of pairs (x, y)
+                                with y at distance at most t from x, for every t. 'distribution'
+                                is the estimated number of pairs at distance exactly t, t = 0
+                                included, and 'full', 'effective' and 'average' are the largest
+                                distance, the effective diameter and the average shortest path
+                                length computed from it as in `diameter.sampledDiameters`
+
+        The counter of node x starts as the set {x}. Pass t replaces it by the union of its own
+        counter and those of its neighbours, all taken after pass t - 1, so that it then holds
+        the ball of radius t around x. Union of HyperLogLog counters is a register-wise maximum,
+        done for a block of nodes with one gather and one np.maximum.reduceat. A counter can only
+        grow in pass t if a neighbour's counter grew in pass t - 1, so every pass recomputes just
+        those nodes, and the passes stop when no counter grows.
+        Registers are uint8 and two sets of counters are kept, one with the values after pass
+        t - 1 and one being written, so memory is 2^(precision + 1) bytes per node (64 with the
+        default precision 5, 128 with 6), independent of the size of the balls, plus
+        blockEdges * 2^precision bytes for the counters gathered for one block. The two sets are
+        allocated once and swapped after every pass
+    """
+
+    n = len(graph)
+    counters = _initialCounters(graph, precision, seed)
+    nextCounters = counters.copy()
+    blocks = _nodeBlocks(graph, blockEdges)
+    hasNeighbours = np.diff(graph.indptr) > 0
+    # Nodes whose counter grew in the last pass, every node before the first one
+    grown = np.ones(n, dtype=bool)
+    neighbourhood = [_estimateTotal(counters, blocks)]
+
+    while maxDistance is None or len(neighbourhood) <= maxDistance:
+        nextGrown = np.zeros(n, dtype=bool)
+        for low, high in blocks:
+            start, end = graph.indptr[low], graph.indptr[high]
+            if start == end:
+                continue
+
+            nodes = low + np.flatnonzero(hasNeighbours[low:high])
+            nodes = nodes[np.logical_or.reduceat(grown[graph.indices[start:end]], graph.indptr[nodes] - start)]
+            if not len(nodes):
+                continue
+
+            degrees = graph.indptr[nodes + 1] - graph.indptr[nodes]
+            gathered = counters[graph.expand(nodes)]
+            maxima = np.maximum.reduceat(gathered, np.cumsum(degrees) - degrees, axis=0)
+            previous = counters[nodes]
+            np.maximum(previous, maxima, out=maxima)
+            grew = (maxima != previous).any(axis=1)
+            nextCounters[nodes[grew]] = maxima[grew]
+            nextGrown[nodes[grew]] = True
+
+        if not nextGrown.any():
+            break
+        counters, nextCounters = nextCounters, counters
+        # The spare set is one pass behind exactly on the counters that just grew
+        nextCounters[nextGrown] = counters[nextGrown]
+        grown = nextGrown
+        neighbourhood.append(_estimateTotal(counters, blocks))
+
+    # Estimates can dip slightly where a counter switches estimators; a ball never shrinks
+    neighbourhood = np.maximum.accumulate(np.array(neighbourhood))
+    distribution = np.diff(neighbourhood, prepend=0.0)
+    hops = np.arange(len(distribution))
+    return {
+        'neighbourhood': neighbourhood,
+        'distribution': distribution,
+        'full': int(np.flatnonzero(distribution)[-1]) if n else 0,
+        'effective': effectiveDiameter(distribution) if n else 0.0,
+        'average': float((hops * distribution).sum() / distribution.sum()) if n else 0.0,
+    }
+
+
+def _initialCounters(graph, precision, seed):
+    """
+        One counter per node holding only the node itself
+    """
+
+    # splitmix64 of the node IDs; uint64 arithmetic wraps around
+    with np.errstate(over="ignore"):
+        h = graph.nodeIDs.astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        h ^= h >> np.uint64(31)
+
+    # The top bits choose the register, the position of the first 1 bit in the low 32 bits is the rank
+    register = (h >> np.uint64(64 - precision)).astype(np.int64)
+    remainder = (h & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    rank = np.full(len(h), 33, dtype=np.uint8)
+    nonzero = remainder > 0
+    rank[nonzero] = 32 - np.floor(np.log2(remainder[nonzero])).astype(np.uint8)
+
+    counters = np.zeros((len(h), 1 << precision), dtype=np.uint8)
+    counters[np.arange(len(h)), register] = rank
+    return counters
+
+
+def _estimateTotal(counters, blocks):
+    """
+        Sum of the HyperLogLog cardinality estimates of all counters
+    """
+
+    m = counters.shape[1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    powers = 2.0 ** -np.arange(_RANKS)
+
+    total = 0.0
+    for low, high in blocks:
+        registers = counters[low:high]
+        estimates = alpha * m * m / powers[registers].sum(axis=1)
+        # Linear counting is more accurate for small sets
+        zeros = (registers == 0).sum(axis=1)
+        small = (estimates <= 2.5 * m) & (zeros > 0)
+        estimates[small] = m * np.log(m / zeros[small])
+        total += estimates.sum()
+    return float(total)
+
+
+def _nodeBlocks(graph, blockEdges):
+    """
+        Ranges of nodes with about blockEdges edges each, at least one node per range
+    """
+
+    n = len(graph)
+    bounds = [0]
+    while bounds[-1] < n:
+        end = int(np.searchsorted(graph.indptr, graph.indptr[bounds[-1]] + blockEdges, side="right")) - 1
+        bounds.append(min(n, max(end, bounds[-1] + 1)))
+    return list(zip(bounds[:-1], bounds[1:]))
@@ -0,0 +1,54 @@
+import shutil
+import subprocess
+import time
+
+
+def writeGnuPlot(plotName, title, xLabel, yLabel, rows, logScale="xy"):
+    """
+        Write a plot as the .tab and .plt files SNAP's Plot* functions write, and render it to .png
+
+        Args:
+        plotName (str) -> File name without extension, e.g. diam.shortest_path_facebook.elist
+        title (str) -> Plot title, also written to the header of both files
+        xLabel (str) -> Label of the x axis, also the header of the first column
+        yLabel (str) -> Label of the y axis, also the header of the second column
+        rows (iterable) -> (x, y) pairs, written with %g as SNAP does
+        logScale (str) -> Axes with a log10 scale: "xy", "y" or ""
+
+        Return:
+        None
+
+        Files go to the current directory, where movePlots in gen_structure.py picks them up.
+        The .png is rendered by gnuplot when it is installed, the same program SNAP calls
+    """
+
+    header = f"#\n# {title} ({time.strftime('%a %b %d %H:%M:%S %Y')})\n#\n"
+    with open(f"{plotName}.tab", "w") as f:
+        f.write(header)
+        f.write(f"# {xLabel}\t{yLabel}\n")
+        f.write("".join(f"{x:g}\t{y:g}\n" for x, y in rows))
+
+    scale = []
+    if logScale:
+        scale.append(f"set logscale {logScale} 10")
+        for axis in logScale:
+            scale.append(f"set format {axis} \"10^{{%L}}\"")
+            scale.append(f"set m{axis}tics 10")
+
+    settings = [
+        f"set title \"{title}\"",
+        "set key bottom right",
+        *scale,
+        "set grid",
+        f"set xlabel \"{xLabel}\"",
+        f"set ylabel \"{yLabel}\"",
+        "set tics scale 2",
+        "set terminal png font arial 10 size 1000,800",
+        f"set output '{plotName}.png'",
+        f"plot \t\"{plotName}.tab\" using 1:2 title \"\" with linespoints pt 6",
+    ]
+    with open(f"{plotName}.plt", "w") as f:
+        f.write(header + "\n" + "\n".join(settings) + "\n")
+
+    if shutil.which("gnuplot"):
+        subprocess.run(["gnuplot", f"{plotName}.plt"], check=False)
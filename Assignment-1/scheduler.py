@@ -0,0 +1,115 @@
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from graph import attachGraph, shareGraph
+
+# Graph of the task worker processes, set once per process by _initWorker
+_workerGraph = None
+
+
+class Task:
+    """
+        One independent part of a computation on a shared graph
+
+        function is called as function(graph, *args, inputs), where inputs maps the name of every
+        task in requires to its return value. It has to be a module level function, so that it
+        can be sent to a worker process
+    """
+
+    def __init__(self, function, requires=()):
+        self.function = function
+        self.requires = tuple(requires)
+
+
+def runTasks(tasks, selected, graph, args=(), workers=1):
+    """
+        Run the selected tasks and the tasks they require, independent ones concurrently
+
+        Args:
+        tasks (dict) -> Maps a task name to its Task
+        selected (iterable) -> Names of the tasks to run
+        graph (CSRGraph) -> Read-only graph every task works on
+        args (tuple) -> Further arguments passed to every task function
+        workers (int) -> Number of processes. With 1 the tasks run one after another in this process
+
+        Return:
+        results (dict) -> Maps every task that ran to its return value
+        timings (dict) -> Maps every task that ran to the seconds its function took
+
+        The graph is copied into shared memory once, and every worker process attaches to it when
+        the pool starts, instead of receiving its own copy. A task is started
+        as soon as all tasks it requires have finished, so the total time is that of the longest
+        chain of dependent tasks rather than the sum over all tasks
+    """
+
+    names = _withRequirements(tasks, selected)
+    results, timings = {}, {}
+
+    if workers <= 1:
+        for name in names:
+            inputs = {required: results[required] for required in tasks[name].requires}
+            results[name], timings[name] = _timedCall(graph, tasks[name].function, args, inputs)
+        return results, timings
+
+    waiting = {name: set(tasks[name].requires) for name in names}
+    blocks, spec = shareGraph(graph)
+    try:
+        with ProcessPoolExecutor(min(workers, len(names)), initializer=_initWorker, initargs=(spec,)) as pool:
+            running = {}
+            while waiting or running:
+                for name in [name for name, requires in waiting.items() if not requires]:
+                    inputs = {required: results[required] for required in tasks[name].requires}
+                    running[pool.submit(_runTask, tasks[name].function, args, inputs)] = name
+                    del waiting[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name], timings[name] = future.result()
+                    for requires in waiting.values():
+                        requires.discard(name)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return results, timings
+
+
+def _withRequirements(tasks, selected):
+    """
+        Names of the selected tasks and everything they require, each after its requirements
+    """
+
+    ordered = []
+
+    def visit(name, path):
+        if name not in tasks:
+            raise ValueError(f"Unknown task {name}")
+        if name in path:
+            raise ValueError(f"Tasks {' -> '.join(path + (name,))} require each other")
+        if name in ordered:
+            return
+        for required in tasks[name].requires:
+            visit(required, path + (name,))
+        ordered.append(name)
+
+    for name in selected:
+        visit(name, ())
+    return ordered
+
+
+def _timedCall(graph, function, args, inputs):
+    start = time.perf_counter()
+    value = function(graph, *args, inputs)
+    return value, time.perf_counter() - start
+
+
+def _initWorker(spec):
+    global _workerGraph
+    _workerGraph = attachGraph(spec)
+
+
+def _runTask(function, args, inputs):
+    return _timedCall(_workerGraph, function, args, inputs)
@@ -0,0 +1,119 @@
+import os
+import shutil
+
+from itertools import islice
+
+import numpy as np
+
+
+def readEdgeChunks(elistPath, srcColumnId=0, destColumnId=1, separator='\t', chunkSize=1 << 20):
+    """
+        Stream an edge list as NumPy arrays, chunkSize lines at a time
+
+        Args:
+        elistPath (str) -> Input edge list. Lines starting with # are skipped
+        srcColumnId (int) -> Column of the source node IDs
+        destColumnId (int) -> Column of the destination node IDs
+        separator (str) -> Column separator, any whitespace is accepted when it is whitespace
+        chunkSize (int) -> Number of lines parsed per chunk
+
+        Return:
+        Generator of (sources, destinations) int64 array pairs
+
+        Keep in step with readEdgeChunks in Assignment-2/src/shards.py, which has the same
+        signature and body
+    """
+
+    delimiter = None if separator.isspace() else separator
+    with open(elistPath) as f:
+        while True:
+            lines = list(islice(f, chunkSize))
+            if not lines:
+                return
+
+            edges = np.loadtxt(lines, dtype=np.int64, comments='#', delimiter=delimiter,
+                               usecols=(srcColumnId, destColumnId), ndmin=2)
+            if len(edges):
+                yield edges[:, 0], edges[:, 1]
+
+
+def extractSubgraphs(elistPath, subgraphs, separator='\t', chunkSize=1 << 20):
+    """
+        Write the node-induced subgraphs of an undirected edge list in one streaming pass
+
+        Args:
+        elistPath (str) -> Input edge list
+        subgraphs (dict) -> Maps a name to (outputPath, predicate). predicate takes an int64 array
+                            of node IDs and returns a boolean mask of the nodes to keep, e.g.
+                            lambda ids: ids % 4 == 0
+        separator (str) -> Column separator of the input edge list
+        chunkSize (int) -> Number of lines held in memory at a time
+
+        Return:
+        counts (dict) -> Maps each name to (nodeCount, edgeCount) of its subgraph
+
+        Each chunk of edges is filtered with one vectorized mask per subgraph, so the full graph
+        is never held in memory: only the chunk and the set of kept node IDs (O(n)) are.
+        An edge is kept when both its endpoints satisfy the predicate, and every node satisfying
+        it counts as a node of the subgraph, as when building it with SNAP's AddNode/AddEdge.
+        Edges are written as (smaller ID, larger ID) and repeats inside a chunk are dropped; the
+        SNAP datasets list every undirected edge once, so no edge repeats across chunks.
+        The output has the same header as snap.SaveEdgeList
+    """
+
+    state = {}
+    for name, (outputPath, predicate) in subgraphs.items():
+        state[name] = {
+            'body': open(f"{outputPath}.edges.tmp", "w"),
+            'nodes': np.empty(0, dtype=np.int64),
+            # Node IDs of chunks not merged into 'nodes' yet, each unique on its own
+            'pending': [],
+            'pendingCount': 0,
+            'edges': 0,
+        }
+
+    try:
+        for sources, destinations in readEdgeChunks(elistPath, separator=separator, chunkSize=chunkSize):
+            low = np.minimum(sources, destinations)
+            high = np.maximum(sources, destinations)
+
+            for name, (outputPath, predicate) in subgraphs.items():
+                current = state[name]
+                keepSource = predicate(low)
+                keepDestination = predicate(high)
+
+                chunkNodes = np.unique(np.concatenate((low[keepSource], high[keepDestination])))
+                current['pending'].append(chunkNodes)
+                current['pendingCount'] += len(chunkNodes)
+                # Merge only once the pending IDs outnumber the merged ones, so the merged set is
+                # not sorted again for every chunk
+                if current['pendingCount'] > len(current['nodes']):
+                    current['nodes'] = np.unique(np.concatenate([current['nodes']] + current['pending']))
+                    current['pending'], current['pendingCount'] = [], 0
+
+                keep = keepSource & keepDestination
+                edges = np.unique(np.stack((low[keep], high[keep]), axis=1), axis=0)
+                if len(edges):
+                    current['body'].write("\n".join(map("{}\t{}".format, edges[:, 0].tolist(),
+                                                        edges[:, 1].tolist())) + "\n")
+                current['edges'] += len(edges)
+
+        counts = {}
+        for name, (outputPath, predicate) in subgraphs.items():
+            current = state[name]
+            current['body'].close()
+            current['nodes'] = np.unique(np.concatenate([current['nodes']] + current['pending']))
+            counts[name] = (len(current['nodes']), current['edges'])
+
+            with open(outputPath, "w") as f, open(f"{outputPath}.edges.tmp") as body:
+                f.write(f"# Undirected graph (each unordered pair of nodes is saved once): {outputPath}\n")
+                f.write(f"# Nodes: {counts[name][0]} Edges: {counts[name][1]}\n")
+                f.write("# NodeId\tNodeId\n")
+                shutil.copyfileobj(body, f)
+    finally:
+        for name, (outputPath, predicate) in subgraphs.items():
+            state[name]['body'].close()
+            if os.path.exists(f"{outputPath}.edges.tmp"):
+                os.remove(f"{outputPath}.edges.tmp")
+
+    return counts
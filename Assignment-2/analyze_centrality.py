@@ -1,35 +1,121 @@
+import hashlib
+import json
 import os
 import snap
 
+from concurrent.futures import ProcessPoolExecutor
+
 from config import CONFIG
-from src.graph import AdjGraph
+from src.session import fileHash, loadGraph
+from src.store import CentralityStore, readCentralityFile, writeCentralityFile
 
 
-def readNodes(filename):
+def readNodes(measure, k=100):
     """
-    Read a centrality file and return top 100 nodes as a set
+    Read the centrality file of a measure and return top k nodes as a set
 
     Parameters
     ----------
-    filename: str or pathlib.Path
-        Name of the file to read
+    measure: str
+        Name of the measure written by gen_centrality.py
+
+    k: int, default = 100
+        Number of top nodes to return
     ----------
 
     Returns
     ----------
     _: set
-        Returns a set of top 100 nodes sorted by centrality value
+        Returns a set of top k nodes sorted by centrality value
     ----------
+
+    Reads <measure>.cent (see src.store) if it exists, otherwise the text file <measure>.txt
+    """
+
+    filePath = os.path.join(CONFIG['CENTRALITIES_PATH'], f"{measure}.cent")
+    if os.path.exists(filePath):
+        return set(nodeID for nodeID, _ in readCentralityFile(filePath).topK(k))
+
+    with open(os.path.join(CONFIG['CENTRALITIES_PATH'], f"{measure}.txt")) as f:
+        return set(int(line.split()[0]) for _, line in zip(range(k), f))
+
+
+def referenceNodes(elistPath, measure, params, compute, k=100):
     """
+    Top k nodes of a SNAP reference centrality, computed once and then read from a cache
 
-    filePath = os.path.join(CONFIG['CENTRALITIES_PATH'], filename)
-    f = open(filePath)
+    Parameters
+    ----------
+    elistPath: str or pathlib.Path
+        Edge list of the graph to compute centralities on
 
-    data = f.readlines()
-    nodes = [node[0:4] for node in data][:100]
-    nodes = [int(node.strip()) for node in nodes]
+    measure: str
+        Name of the measure
 
-    return set(nodes)
+    params: dict
+        Keyword arguments of compute
+
+    compute: function
+        compute(elistPath, **params) returns a dictionary with node ID keys and reference values
+
+    k: int, default = 100
+        Number of top nodes to return
+    ----------
+
+    Returns
+    ----------
+    _: set
+        Returns a set of top k nodes sorted by reference centrality value
+    ----------
+
+    Reference values are stored as binary centrality files (see src.store) in REFERENCE_PATH.
+    The file name is a digest of the edge list's contents, the measure and params, so editing
+    the edge list or changing a parameter computes the reference again
+    """
+
+    key = f"{fileHash(elistPath)} {measure} {json.dumps(params, sort_keys=True)}"
+    filePath = os.path.join(CONFIG['REFERENCE_PATH'], f"{measure}-{hashlib.sha1(key.encode()).hexdigest()}.cent")
+
+    if os.path.exists(filePath):
+        store = readCentralityFile(filePath)
+    else:
+        store = CentralityStore.fromDict(measure, compute(elistPath, **params), params)
+        # writeCentralityFile renames the file into place, so a concurrent run never reads a partial file
+        writeCentralityFile(filePath, store)
+
+    return set(nodeID for nodeID, _ in store.topK(k))
+
+
+def _snapCloseness(elistPath):
+    """
+    Closeness centrality of every node with snap.GetClosenessCentr
+    """
+
+    graph = loadGraph(elistPath, separator=" ").SNAPGraph
+    return {node.GetId(): snap.GetClosenessCentr(graph, node.GetId()) for node in graph.Nodes()}
+
+
+def _snapBetweenness(elistPath, nodeFrac):
+    """
+    Betweenness centrality of every node with snap.GetBetweennessCentr
+    """
+
+    graph = loadGraph(elistPath, separator=" ").SNAPGraph
+    Nodes = snap.TIntFltH()
+    Edges = snap.TIntPrFltH()
+    snap.GetBetweennessCentr(graph, Nodes, Edges, nodeFrac)
+    return {int(node): Nodes[node] for node in Nodes}
+
+
+def _snapPageRank(elistPath, alpha):
+    """
+    PageRank of every node with snap.GetPageRank
+    """
+
+    graph = loadGraph(elistPath, separator=" ").SNAPGraph
+    PRankH = snap.TIntFltH()
+    snap.GetPageRank(graph, PRankH, alpha)
+    return {int(item): PRankH[item] for item in PRankH}
 
 
 def _closenessOverlap(elistPath):
@@ -54,23 +140,13 @@ def _closenessOverlap(elistPath):
         Count of overlapping nodes between the 2 sets
     ----------
 
-    Reads from file our values of closeness centrality and then calls the SNAP function
+    Reads from file our values of closeness centrality and then calls the SNAP function, unless its
+    result is already cached (see `referenceNodes`)
     Once we have 2 sets of top 100 nodes, perform a set.intersection() call for common elements between both sets
     """
 
-    adjGraph = AdjGraph(elistPath, separator=" ")
-    graph = adjGraph.SNAPGraph
-    calculatedNodes = readNodes("closeness.txt")
-
-    SNAPCC = {}
-    for node in graph.Nodes():
-        SNAPCC[node.GetId()] = snap.GetClosenessCentr(graph, node.GetId())
-
-    SNAPCC = {k: v for k, v in sorted(
-        SNAPCC.items(), key=lambda x: x[1], reverse=True)}
-
-    SNAPNodes = list(SNAPCC.keys())[:100]
-    SNAPNodes = set([int(node) for node in SNAPNodes])
+    calculatedNodes = readNodes("closeness")
+    SNAPNodes = referenceNodes(elistPath, "closeness", {}, _snapCloseness)
 
     overlap = SNAPNodes.intersection(calculatedNodes)
     return (calculatedNodes, SNAPNodes, len(overlap))
@@ -101,26 +177,13 @@ def _betweennessOverlap(elistPath, nodeFrac=0.8):
         Count of overlapping nodes between the 2 sets
     ----------
 
-    Reads from file our values of betweenness centrality and then calls the SNAP function
+    Reads from file our values of betweenness centrality and then calls the SNAP function, unless its
+    result is already cached (see `referenceNodes`)
     Once we have 2 sets of top 100 nodes, perform a set.intersection() call for common elements between both sets
     """
 
-    adjGraph = AdjGraph(elistPath, separator=" ")
-    graph = adjGraph.SNAPGraph
-    calculatedNodes = readNodes("betweenness.txt")
-
-    Nodes = snap.TIntFltH()
-    Edges = snap.TIntPrFltH()
-    snap.GetBetweennessCentr(graph, Nodes, Edges, nodeFrac)
-    SNAPBC = {}
-    for node in Nodes:
-        SNAPBC[node] = Nodes[node]
-
-    SNAPBC = {k: v for k, v in sorted(
-        SNAPBC.items(), key=lambda x: x[1], reverse=True)}
-
-    SNAPNodes = list(SNAPBC.keys())[:100]
-    SNAPNodes = set([int(node) for node in SNAPNodes])
+    calculatedNodes = readNodes("betweenness")
+    SNAPNodes = referenceNodes(elistPath, "betweenness", {'nodeFrac': nodeFrac}, _snapBetweenness)
 
     overlap = SNAPNodes.intersection(calculatedNodes)
     return (calculatedNodes, SNAPNodes, len(overlap))
@@ -151,25 +214,13 @@ def _pageRankOverlap(elistPath, alpha=0.85):
         Count of overlapping nodes between the 2 sets
     ----------
 
-    Reads from file our values of PageRank centrality and then calls the SNAP function
+    Reads from file our values of PageRank centrality and then calls the SNAP function, unless its
+    result is already cached (see `referenceNodes`)
     Once we have 2 sets of top 100 nodes, perform a set.intersection() call for common elements between both sets
     """
 
-    adjGraph = AdjGraph(elistPath, separator=" ")
-    graph = adjGraph.SNAPGraph
-    calculatedNodes = readNodes("pagerank.txt")
-
-    SNAPPR = {}
-    PRankH = snap.TIntFltH()
-    snap.GetPageRank(graph, PRankH, alpha)
-    for item in PRankH:
-        SNAPPR[item] = PRankH[item]
-
-    SNAPPR = {k: v for k, v in sorted(
-        SNAPPR.items(), key=lambda x: x[1], reverse=True)}
-
-    SNAPNodes = list(SNAPPR.keys())[:100]
-    SNAPNodes = set([int(node) for node in SNAPNodes])
+    calculatedNodes = readNodes("pagerank")
+    SNAPNodes = referenceNodes(elistPath, "pagerank", {'alpha': alpha}, _snapPageRank)
 
     overlap = SNAPNodes.intersection(calculatedNodes)
     return (calculatedNodes, SNAPNodes, len(overlap))
@@ -180,13 +231,20 @@ if __name__ == "__main__":
     elistName = CONFIG["ELIST_NAME"]
     elistPath = os.path.join(CONFIG['DATASET_PATH'], elistName)
 
-    _, _, closenessOverlap = _closenessOverlap(elistPath)
-    print(f"#overlaps for Closeness Centrality: {closenessOverlap}")
+    # Load once here so that the graph snapshot exists before the processes below read it
+    loadGraph(elistPath, separator=" ")
+
+    # The three comparisons are independent, run them in parallel processes
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        closeness = pool.submit(_closenessOverlap, elistPath)
+        betweenness = pool.submit(_betweennessOverlap, elistPath, nodeFrac=CONFIG['BETWEENNESS_NODEFRAC'])
+        pagerank = pool.submit(_pageRankOverlap, elistPath, alpha=0.8)
+
+        _, _, closenessOverlap = closeness.result()
+        print(f"#overlaps for Closeness Centrality: {closenessOverlap}")
 
-    _, _, betweennessOverlap = _betweennessOverlap(
-        elistPath, nodeFrac=CONFIG['BETWEENNESS_NODEFRAC'])
-    print(f"#overlaps for Betweenness Centrality: {betweennessOverlap}")
+        _, _, betweennessOverlap = betweenness.result()
+        print(f"#overlaps for Betweenness Centrality: {betweennessOverlap}")
 
-    _, _, pagerankOverlap = _pageRankOverlap(
-        elistPath, alpha=0.8)
-    print(f"##overlaps for PageRank Centrality: {pagerankOverlap}")
+        _, _, pagerankOverlap = pagerank.result()
+        print(f"##overlaps for PageRank Centrality: {pagerankOverlap}")
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from config import CONFIG
+from src.graph import AdjGraph
+from src.generators import erdosRenyi, barabasiAlbert, grid
+from src.closeness import closenessCentrality, topKCloseness
+from src.betweenness import betweennessCentrality
+from src.pagerank import biasedPageRank
+
+
+# Graph families, each built from (number of nodes, seed)
+GRAPHS = {
+    'er': lambda n, seed: erdosRenyi(n, averageDegree=10, seed=seed),
+    'ba': lambda n, seed: barabasiAlbert(n, m=5, seed=seed),
+    'grid': lambda n, seed: grid(int(round(n ** 0.5))),
+}
+
+# Centrality functions, each returning (dict of node ID -> value, time taken)
+KERNELS = {
+    'closeness-dict': lambda g: closenessCentrality(g, backend="dict"),
+    'betweenness-dict': lambda g: betweennessCentrality(g, backend="dict"),
+    'pagerank-dict': lambda g: _dropIterations(*biasedPageRank(
+        g, alpha=CONFIG['PAGERANK_ALPHA'], max_iterations=CONFIG['PAGERANK_MAXITER'],
+        tolerance=CONFIG['PAGERANK_TOLERANCE'], backend="dict")),
+    'closeness-csr': lambda g: closenessCentrality(g, backend="csr"),
+    'closeness-msbfs': lambda g: closenessCentrality(g, backend="msbfs"),
+    'closeness-topk': lambda g: _topKDict(*topKCloseness(g, k=100)),
+    'betweenness-csr': lambda g: betweennessCentrality(g, backend="csr"),
+    'pagerank-sparse': lambda g: _dropIterations(*biasedPageRank(
+        g, alpha=CONFIG['PAGERANK_ALPHA'], max_iterations=CONFIG['PAGERANK_MAXITER'],
+        tolerance=CONFIG['PAGERANK_TOLERANCE'], backend="sparse")),
+}
+
+# Kernels that only run on graphs of at most BENCHMARK_DICT_NODES nodes, being the slowest
+DICT_KERNELS = ('closeness-dict', 'betweenness-dict', 'pagerank-dict')
+
+
+def _topKDict(topK, diff):
+    return dict(topK), diff
+
+
+def _dropIterations(pageRank, convIteration, diff):
+    return pageRank, diff
+
+
+def fingerprint(values, top=10):
+    """
+    Summarize a centrality result so it can be compared against a baseline
+
+    Parameters
+    ----------
+    values: dict
+        Dictionary with node ID keys and centrality measure values
+
+    top: int, default = 10
+        Number of highest ranked node IDs to keep
+    ----------
+
+    Returns
+    ----------
+    _: dict
+        Sum of all values and the IDs of the `top` highest ranked nodes
+    ----------
+    """
+
+    ranked = sorted(values.items(), key=lambda x: (-x[1], x[0]))
+    return {'sum': sum(values.values()), 'top': [int(k) for k, _ in ranked[:top]]}
+
+
+def runBenchmark(graphName, n, kernelName, seed, repeats=3):
+    """
+    Time one centrality function on one synthetic graph
+
+    Parameters
+    ----------
+    graphName: str
+        Key of GRAPHS
+
+    n: int
+        Number of nodes of the graph
+
+    kernelName: str
+        Key of KERNELS
+
+    seed: int
+        Seed for the graph generator
+
+    repeats: int, default = 3
+        Number of timed runs, the fastest one is reported
+    ----------
+
+    Returns
+    ----------
+    _: dict
+        Graph size, best wall-clock time, peak traced memory and result fingerprint
+    ----------
+
+    Peak memory is measured with tracemalloc (which NumPy reports its arrays to) in a separate,
+    untimed run, since tracing slows down Python code
+    """
+
+    adjGraph = AdjGraph.fromCSR(GRAPHS[graphName](n, seed))
+    kernel = KERNELS[kernelName]
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        values, _ = kernel(adjGraph)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    kernel(adjGraph)
+    _, peakMemory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'graph': graphName,
+        'n': len(adjGraph),
+        'edges': adjGraph.csr.edgeCount // 2,
+        'kernel': kernelName,
+        'time': min(times),
+        'peakMemory': peakMemory,
+        'result': fingerprint(values),
+    }
+
+
+def compareBaseline(result, baseline, slowdown):
+    """
+    List the ways in which a benchmark result regressed against its baseline
+
+    Parameters
+    ----------
+    result: dict
+        Output of `runBenchmark`
+
+    baseline: dict
+        Stored output of `runBenchmark` for the same graph, size and kernel
+
+    slowdown: float
+        Allowed relative increase of time
+    ----------
+
+    Returns
+    ----------
+    problems: list
+        Human readable descriptions, empty if there is no regression
+    ----------
+    """
+
+    problems = []
+    if result['time'] > baseline['time'] * (1 + slowdown):
+        problems.append(f"time {result['time']:.3f}s vs baseline {baseline['time']:.3f}s")
+
+    expected = baseline['result']
+    if abs(result['result']['sum'] - expected['sum']) > 1e-9 * max(1.0, abs(expected['sum'])):
+        problems.append(f"value sum {result['result']['sum']:.9g} vs baseline {expected['sum']:.9g}")
+    if result['result']['top'] != expected['top']:
+        problems.append("top ranked nodes differ from baseline")
+    return problems
+
+
+def _key(result):
+    return f"{result['graph']}/{result['n']}/{result['kernel']}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark centrality functions on seeded synthetic graphs")
+    parser.add_argument("--graphs", nargs="+", default=list(GRAPHS), choices=list(GRAPHS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 4000])
+    parser.add_argument("--kernels", nargs="+", default=list(KERNELS), choices=list(KERNELS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=CONFIG['BENCHMARK_SEED'])
+    parser.add_argument("--baseline", default=os.path.join(CONFIG['BENCHMARK_PATH'], "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store these results as the new baseline instead of comparing against it")
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baselines = {_key(result): result for result in json.load(f)}
+
+    results = []
+    regressions = 0
+    print(f"{'graph':<6}{'n':>8}{'edges':>10}  {'kernel':<18}{'time (s)':>10}{'peak MB':>10}  status")
+    for graphName in args.graphs:
+        for n in args.sizes:
+            for kernelName in args.kernels:
+                if kernelName in DICT_KERNELS and n > CONFIG['BENCHMARK_DICT_NODES']:
+                    continue
+                result = runBenchmark(graphName, n, kernelName, args.seed, args.repeats)
+                results.append(result)
+
+                if _key(result) not in baselines:
+                    status = "no baseline"
+                else:
+                    problems = compareBaseline(result, baselines[_key(result)], CONFIG['BENCHMARK_SLOWDOWN'])
+                    status = "; ".join(problems) if problems else "ok"
+                    regressions += bool(problems)
+
+                print(f"{graphName:<6}{result['n']:>8}{result['edges']:>10}  {kernelName:<18}"
+                      f"{result['time']:>10.3f}{result['peakMemory'] / 2 ** 20:>10.1f}  {status}")
+
+    with open(os.path.join(CONFIG['BENCHMARK_PATH'], "results.json"), "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} regression(s) against {args.baseline}")
+        sys.exit(1)
@@ -0,0 +1,103 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmark import GRAPHS
+from config import CONFIG
+from src.graph import AdjGraph
+from src.pagerank import ACCELERATIONS, acceleratedPageRank
+from src.session import loadGraph
+
+
+def compareStrategies(adjGraph, methods, repeats=3):
+    """
+    Run PageRank with every acceleration strategy on one graph
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Graph to compute PageRank on, with the preference vector of gen_centrality.py (id % 4 == 0)
+
+    methods: list
+        Strategies from src.pagerank.ACCELERATIONS, "power" is always run as the reference
+
+    repeats: int, default = 3
+        Number of timed runs per strategy, the fastest one is reported
+    ----------
+
+    Returns
+    ----------
+    results: list
+        One dict per strategy with its passes over the edges, best time, final residual and the
+        L1 distance of its result to the result of power iteration
+    ----------
+    """
+
+    nodeIDs = adjGraph.csr.nodeIDs.tolist()
+    preference = [node for node in nodeIDs if node % 4 == 0]
+    methods = ["power"] + [method for method in methods if method != "power"]
+
+    results = []
+    for method in methods:
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            pageRank, convIteration, residuals, _ = acceleratedPageRank(
+                adjGraph, preference_vector=preference, alpha=CONFIG['PAGERANK_ALPHA'],
+                max_iterations=CONFIG['PAGERANK_MAXITER'], tolerance=CONFIG['PAGERANK_TOLERANCE'], method=method)
+            times.append(time.perf_counter() - start)
+
+        values = np.array([pageRank[node] for node in nodeIDs])
+        if method == "power":
+            reference = values
+        results.append({
+            'method': method,
+            'iterations': convIteration,
+            'time': min(times),
+            'residual': residuals[-1],
+            'distance': float(np.abs(values - reference).sum()),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare PageRank acceleration strategies at PAGERANK_ALPHA")
+    parser.add_argument("--graphs", nargs="+", default=["elist"] + list(GRAPHS), choices=["elist"] + list(GRAPHS),
+                        help="elist is the edge list ELIST_NAME, the others are seeded synthetic graphs")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10000, 100000])
+    parser.add_argument("--methods", nargs="+", default=list(ACCELERATIONS), choices=list(ACCELERATIONS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=CONFIG['BENCHMARK_SEED'])
+    args = parser.parse_args()
+
+    graphs = []
+    for graphName in args.graphs:
+        if graphName == "elist":
+            elistPath = os.path.join(CONFIG['DATASET_PATH'], CONFIG['ELIST_NAME'])
+            if os.path.exists(elistPath):
+                graphs.append((CONFIG['ELIST_NAME'], loadGraph(elistPath, separator=" ")))
+            else:
+                print(f"Skipping {elistPath}, which does not exist")
+        else:
+            graphs.extend((f"{graphName}-{n}", AdjGraph.fromCSR(GRAPHS[graphName](n, args.seed))) for n in args.sizes)
+
+    print(f"alpha = {CONFIG['PAGERANK_ALPHA']}, tolerance = {CONFIG['PAGERANK_TOLERANCE']} per node")
+    print(f"{'graph':<16}{'method':<14}{'passes':>11}{'time (s)':>10}{'saved':>10}{'saved time':>11}"
+          f"{'residual':>11}{'L1 to power':>13}")
+    slower = []
+    for name, adjGraph in graphs:
+        results = compareStrategies(adjGraph, args.methods, args.repeats)
+        power = results[0]
+        for result in results:
+            savedTime = 1 - result['time'] / power['time']
+            print(f"{name:<16}{result['method']:<14}{result['iterations']:>11}{result['time']:>10.3f}"
+                  f"{power['iterations'] - result['iterations']:>10}{savedTime:>11.0%}"
+                  f"{result['residual']:>11.2e}{result['distance']:>13.2e}")
+            if result['iterations'] > power['iterations']:
+                slower.append(f"{result['method']} on {name}")
+
+    # A strategy is no help on a graph where it needs more passes than power iteration
+    if slower:
+        print(f"More passes than power iteration: {', '.join(slower)}")
@@ -3,26 +3,65 @@ from pathlib import Path
 
 DATASET_PATH = Path("./SNAP-Data")
 CENTRALITIES_PATH = Path("./centralities")
+BENCHMARK_PATH = Path("./benchmarks")
+# Cached SNAP reference centralities used by analyze_centrality.py
+REFERENCE_PATH = CENTRALITIES_PATH / "reference"
 ELIST_NAME = "facebook.elist"
 
 BETWEENNESS_NODEFRAC = 0.8
+# Processes used by our betweenness implementation, 1 runs it serially
+BETWEENNESS_WORKERS = os.cpu_count() or 1
+# Progress of the closeness/betweenness traversals is saved here every CHECKPOINT_SOURCES
+# sources or CHECKPOINT_SECONDS seconds, and an interrupted run resumes from it
+BETWEENNESS_CHECKPOINT = CENTRALITIES_PATH / "betweenness.checkpoint.npz"
+CHECKPOINT_SOURCES = 1000
+CHECKPOINT_SECONDS = 300
 
 PAGERANK_ALPHA = 0.8
 PAGERANK_MAXITER = 128
 PAGERANK_TOLERANCE = 1e-9
 
+# Also export centralities as text files next to the binary ones (see src.store)
+CENTRALITY_TEXT = True
+
+# JSON report of src.instrument written at the end of gen_centrality.py
+INSTRUMENTATION_REPORT = CENTRALITIES_PATH / "report.json"
+
+BENCHMARK_SEED = 42
+# Allowed relative slowdown against the stored baseline before benchmark.py reports a regression
+BENCHMARK_SLOWDOWN = 0.25
+# The original dictionary backends of benchmark.py are only run on graphs of at most this many nodes
+BENCHMARK_DICT_NODES = 1000
+
 if not os.path.exists(DATASET_PATH):
     os.mkdir(DATASET_PATH)
 
 if not os.path.exists(CENTRALITIES_PATH):
     os.mkdir(CENTRALITIES_PATH)
 
+if not os.path.exists(REFERENCE_PATH):
+    os.mkdir(REFERENCE_PATH)
+
+if not os.path.exists(BENCHMARK_PATH):
+    os.mkdir(BENCHMARK_PATH)
+
 CONFIG = {
     'DATASET_PATH': DATASET_PATH,
     'CENTRALITIES_PATH': CENTRALITIES_PATH,
+    'BENCHMARK_PATH': BENCHMARK_PATH,
+    'REFERENCE_PATH': REFERENCE_PATH,
     'ELIST_NAME': ELIST_NAME,
     'BETWEENNESS_NODEFRAC': BETWEENNESS_NODEFRAC,
+    'BETWEENNESS_WORKERS': BETWEENNESS_WORKERS,
+    'BETWEENNESS_CHECKPOINT': BETWEENNESS_CHECKPOINT,
+    'CHECKPOINT_SOURCES': CHECKPOINT_SOURCES,
+    'CHECKPOINT_SECONDS': CHECKPOINT_SECONDS,
     'PAGERANK_ALPHA': PAGERANK_ALPHA,
     'PAGERANK_MAXITER': PAGERANK_MAXITER,
-    'PAGERANK_TOLERANCE': PAGERANK_TOLERANCE
+    'PAGERANK_TOLERANCE': PAGERANK_TOLERANCE,
+    'CENTRALITY_TEXT': CENTRALITY_TEXT,
+    'INSTRUMENTATION_REPORT': INSTRUMENTATION_REPORT,
+    'BENCHMARK_SEED': BENCHMARK_SEED,
+    'BENCHMARK_SLOWDOWN': BENCHMARK_SLOWDOWN,
+    'BENCHMARK_DICT_NODES': BENCHMARK_DICT_NODES
 }
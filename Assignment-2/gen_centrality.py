@@ -1,38 +1,42 @@
 import os
 
 from config import CONFIG
-from src.graph import AdjGraph
+from src import instrument
+from src.checkpoint import Checkpoint
+from src.session import loadGraph
+from src.store import CentralityStore, writeCentralityFile
 from src.closeness import closenessCentrality
 from src.betweenness import betweennessCentrality
 from src.pagerank import biasedPageRank
+from src.traversal import allSourcesTraversal
 
 
-def writeCentrality(filename, data):
+def writeCentrality(measure, data, params=None):
     """
     Write centrality values to disk in a sorted order
 
     Parameters
     ----------
-    filename: str or pathlib.Path
-        Name of the file to write to
+    measure: str
+        Name of the measure, the files written are <measure>.cent and <measure>.txt
 
     data: dict
         Dictionary with node ID keys and centrality measure values
+
+    params: dict, default = None
+        Parameters the values were computed with, stored in the header of the binary file
     ----------
 
-    When writing to disk, sort `data` by the value in descending order
-    For each node, write a new line with <NODE ID>\t<CENTRALITY_VALUE>
+    <measure>.cent is a binary centrality file (see src.store) that answers top-k, rank and score
+    queries without parsing. If CENTRALITY_TEXT is set, the values are also exported as text,
+    sorted by value in descending order with a line <NODE ID>\t<CENTRALITY_VALUE> per node
     """
 
-    filePath = os.path.join(CONFIG['CENTRALITIES_PATH'], filename)
-    f = open(filePath, "w")
-
-    data = {k: v for k, v in sorted(
-        data.items(), key=lambda x: x[1], reverse=True)}
-
-    for k, v in data.items():
-        text = f"{k:<4}\t{v:.6f}\n"
-        f.write(text)
+    with instrument.phase(f"write.{measure}"):
+        store = CentralityStore.fromDict(measure, data, params)
+        writeCentralityFile(os.path.join(CONFIG['CENTRALITIES_PATH'], f"{measure}.cent"), store)
+        if CONFIG['CENTRALITY_TEXT']:
+            store.exportText(os.path.join(CONFIG['CENTRALITIES_PATH'], f"{measure}.txt"))
 
 
 def getCloseness(elistPath):
@@ -53,13 +57,14 @@ def getCloseness(elistPath):
 
     Compute closeness centrality values and call function `writeCentrality` to write them to disk
     """
-    adjGraph = AdjGraph(elistPath, separator=" ")
-    closeness_centrality, time = closenessCentrality(adjGraph)
-    writeCentrality("closeness.txt", closeness_centrality)
+    adjGraph = loadGraph(elistPath, separator=" ")
+    with instrument.phase("closeness"):
+        closeness_centrality, time = closenessCentrality(adjGraph)
+    writeCentrality("closeness", closeness_centrality)
     return time
 
 
-def getBetweenness(elistPath):
+def getBetweenness(elistPath, workers=1, checkpoint=None):
     """
     Driver function to compute betweenness centrality with our implementation
 
@@ -67,6 +72,12 @@ def getBetweenness(elistPath):
     ----------
     elistPath: str or pathlib.Path
         Edge list of the graph to compute centralities on
+
+    workers: int, default = 1
+        Number of processes to split the source nodes across
+
+    checkpoint: src.checkpoint.Checkpoint, default = None
+        Save progress periodically and resume an interrupted run
     ----------
 
     Returns
@@ -78,9 +89,46 @@ def getBetweenness(elistPath):
     Compute betweenness centrality values and call function `writeCentrality` to write them to disk
     """
 
-    adjGraph = AdjGraph(elistPath, separator=" ")
-    betweenness_centrality, time = betweennessCentrality(adjGraph)
-    writeCentrality("betweenness.txt", betweenness_centrality)
+    adjGraph = loadGraph(elistPath, separator=" ")
+    with instrument.phase("betweenness"):
+        betweenness_centrality, time = betweennessCentrality(adjGraph, workers=workers, checkpoint=checkpoint)
+    writeCentrality("betweenness", betweenness_centrality, {'workers': workers})
+    return time
+
+
+def getClosenessBetweenness(elistPath, workers=1, checkpoint=None):
+    """
+    Driver function to compute closeness and betweenness centrality with one BFS per node
+
+    Parameters
+    ----------
+    elistPath: str or pathlib.Path
+        Edge list of the graph to compute centralities on
+
+    workers: int, default = 1
+        Number of processes to split the source nodes across
+
+    checkpoint: src.checkpoint.Checkpoint, default = None
+        Save progress periodically and resume an interrupted run
+    ----------
+
+    Returns
+    ----------
+    time: float
+        Time taken to calculate both centralities
+    ----------
+
+    Both measures come from the same traversals (see `src.traversal.allSourcesTraversal`), so this
+    costs about as much as `getBetweenness` alone. Values are written as `getCloseness` and
+    `getBetweenness` write them
+    """
+
+    adjGraph = loadGraph(elistPath, separator=" ")
+    with instrument.phase("closenessBetweenness"):
+        results, time = allSourcesTraversal(adjGraph, measures=("closeness", "betweenness"), workers=workers,
+                                            checkpoint=checkpoint)
+    writeCentrality("closeness", results['closeness'])
+    writeCentrality("betweenness", results['betweenness'], {'workers': workers})
     return time
 
 
@@ -112,7 +160,7 @@ def getPageRank(elistPath, alpha, maxiter, tolerance):
     Compute PageRank values and call function `writeCentrality` to write them to disk
     """
 
-    adjGraph = AdjGraph(elistPath, separator=" ")
+    adjGraph = loadGraph(elistPath, separator=" ")
     graph = adjGraph.SNAPGraph
 
     preference_vector = []
@@ -121,11 +169,13 @@ def getPageRank(elistPath, alpha, maxiter, tolerance):
         if (id % 4) == 0:
             preference_vector.append(id)
 
-    pageRank, convIter, time = biasedPageRank(
-        adjGraph, preference_vector=preference_vector, alpha=alpha,
-        max_iterations=maxiter, tolerance=tolerance)
+    with instrument.phase("pagerank"):
+        pageRank, convIter, time = biasedPageRank(
+            adjGraph, preference_vector=preference_vector, alpha=alpha,
+            max_iterations=maxiter, tolerance=tolerance)
 
-    writeCentrality("pagerank.txt", pageRank)
+    writeCentrality("pagerank", pageRank, {'alpha': alpha, 'max_iterations': maxiter, 'tolerance': tolerance,
+                                           'preference_vector': "id % 4 == 0", 'iterations': convIter})
     return pageRank, convIter, time
 
 
@@ -137,16 +187,19 @@ if __name__ == "__main__":
     if not os.path.exists(elistPath):
         raise Exception(f"The elist {elistPath} does not exist!")
 
-    timeCC = getCloseness(elistPath)
+    # Closeness and betweenness share one BFS per node
+    # Rerunning after an interruption continues from the last checkpoint
+    checkpoint = Checkpoint(CONFIG['BETWEENNESS_CHECKPOINT'], every=CONFIG['CHECKPOINT_SOURCES'],
+                            seconds=CONFIG['CHECKPOINT_SECONDS'])
+    timeCCBC = getClosenessBetweenness(elistPath, workers=CONFIG['BETWEENNESS_WORKERS'], checkpoint=checkpoint)
     # print(
-    #     f"Closeness centrality calculation -> {timeCC} seconds | {timeCC / 60} minutes")
-
-    timeBC = getBetweenness(elistPath)
-    # print(
-    #     f"Betweenness centrality calculation -> {timeBC} seconds | {timeBC / 60} minutes")
+    #     f"Closeness and betweenness centrality calculation -> {timeCCBC} seconds | {timeCCBC / 60} minutes")
 
     pageRank, convIter, timePR = getPageRank(elistPath, alpha=CONFIG['PAGERANK_ALPHA'],
                                              maxiter=CONFIG['PAGERANK_MAXITER'],
                                              tolerance=CONFIG['PAGERANK_TOLERANCE'])
     # print(
     #     f"PageRank centrality calculation -> {timePR} seconds  |  {timePR / 60} minutes")
+
+    # Per-phase timings, counters, PageRank residuals and peak memory of this run
+    instrument.writeReport(CONFIG['INSTRUMENTATION_REPORT'])
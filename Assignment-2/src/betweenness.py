@@ -1,9 +1,17 @@
 import time
 
+import numpy as np
+
 from collections import deque
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.special import erfinv
+
+from src import instrument
+from src.traversal import finalizeMeasure, shortestPathDAG, traversalWorkspace, traverseSources
 
 
-def betweennessCentrality(adjGraph):
+def betweennessCentrality(adjGraph, backend="dict", workers=1, checkpoint=None):
     """
     Compute betweenness centrality for all nodes of a graph
 
@@ -11,6 +19,18 @@ def betweennessCentrality(adjGraph):
     ----------
     adjGraph: src.graph.AdjGraph
         Graph object for which centrality needs to be computed
+
+    backend: str, default = "dict"
+        "dict" runs Brandes' algorithm over the dictionary adjacency `adjGraph.adj`
+        "csr" runs a vectorized, level-synchronous version over the CSR arrays `adjGraph.csr`
+
+    workers: int, default = 1
+        Number of processes to split source nodes across. Any value above 1
+        runs the "csr" backend in a process pool, see `src.traversal.traverseSources`
+
+    checkpoint: src.checkpoint.Checkpoint, default = None
+        Periodically save progress to disk, and resume from the checkpoint of an interrupted
+        run with the same graph. Runs the "csr" backend
     ----------
 
     Returns
@@ -32,6 +52,14 @@ def betweennessCentrality(adjGraph):
 
     start = time.time()
     n = len(adjGraph)
+
+    if backend == "csr" or workers > 1 or checkpoint is not None:
+        betweenness_centrality = _csrBetweenness(adjGraph.csr, workers=workers, checkpoint=checkpoint)
+        diff = time.time() - start
+        return (betweenness_centrality, diff)
+    elif backend != "dict":
+        raise ValueError(f"Unknown backend {backend}")
+
     graph = adjGraph.SNAPGraph
     betweenness_centrality = {}
 
@@ -39,24 +67,29 @@ def betweennessCentrality(adjGraph):
         betweenness_centrality[node.GetId()] = 0.0
 
     for node in graph.Nodes():
-        reachable, parents, pathCounts = shortestPaths(adjGraph, node)
-        # Delta from Brandes' Algorithm
-        delta = dict.fromkeys(reachable, 0)
+        with instrument.phase("betweenness.shortestPaths"):
+            reachable, parents, pathCounts = shortestPaths(adjGraph, node)
+        instrument.count("betweenness.sources")
 
-        while reachable:
-            w = reachable.pop()
-            coeff = (1 + delta[w]) / pathCounts[w]
+        with instrument.phase("betweenness.accumulate"):
+            # Delta from Brandes' Algorithm
+            delta = dict.fromkeys(reachable, 0)
 
-            for v in parents[w]:
-                delta[v] += pathCounts[v] * coeff
+            while reachable:
+                w = reachable.pop()
+                coeff = (1 + delta[w]) / pathCounts[w]
 
-            if w != node:
-                betweenness_centrality[w] += delta[w]
+                for v in parents[w]:
+                    delta[v] += pathCounts[v] * coeff
 
-    # No factor of 2 since it is an undirected graph and we're normalizing for it when calculating betweenness
-    normalizationConstant = 1 / ((n - 1) * (n - 2))
-    for k, v in betweenness_centrality.items():
-        betweenness_centrality[k] *= normalizationConstant
+                if w != node.GetId():
+                    betweenness_centrality[w] += delta[w]
+
+    with instrument.phase("betweenness.normalize"):
+        # No factor of 2 since it is an undirected graph and we're normalizing for it when calculating betweenness
+        normalizationConstant = 1 / ((n - 1) * (n - 2))
+        for k, v in betweenness_centrality.items():
+            betweenness_centrality[k] *= normalizationConstant
 
     end = time.time()
     diff = end - start
@@ -110,9 +143,11 @@ def shortestPaths(adjGraph, startNode):
 
     queue = deque()
     queue.append(startNode.GetId())
+    edgesRelaxed = 0
     while queue:
         u = queue.popleft()
         reachable.append(u)
+        edgesRelaxed += len(adj[u])
 
         for v in adj[u]:
             if v not in distances:
@@ -125,4 +160,219 @@ def shortestPaths(adjGraph, startNode):
                 # If node is at same distance, add u to parents list of v
                 parents[v].append(u)
 
+    instrument.count("betweenness.edgesRelaxed", edgesRelaxed)
     return reachable, parents, pathCounts
+
+
+def _csrBetweenness(csr, workers=1, checkpoint=None):
+    """
+    Betweenness centrality of every node of a src.graph.CSRGraph
+    Same definition and normalization as `betweennessCentrality`
+    """
+
+    totals = traverseSources(csr, np.arange(len(csr)), ("betweenness",), workers=workers, checkpoint=checkpoint)
+    return csr.toDict(finalizeMeasure("betweenness", totals, len(csr)))
+
+
+def edgeBetweennessCentrality(adjGraph, workers=1):
+    """
+    Compute betweenness centrality of all nodes and of all edges with one Brandes pass
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Graph object for which centrality needs to be computed
+
+    workers: int, default = 1
+        Number of processes to split source nodes across
+    ----------
+
+    Returns
+    -------
+    betweenness_centrality : dict
+        Dictionary with node ID as key and betweenness centrality being value, as in `betweennessCentrality`
+
+    edge_betweenness : dict
+        Dictionary with (source ID, destination ID) as key and edge betweenness being value.
+        Undirected edges appear once, with the smaller ID first. Normalized differently from
+        betweenness_centrality, see below
+
+    diff: float
+       time taken to calculate both for all nodes and edges
+    ----------
+
+    The backward phase of Brandes' algorithm already computes the dependency of a source on every
+    edge (u, v) of its shortest path DAG, pathCounts[u] / pathCounts[v] * (1 + delta[v]), before
+    adding it into delta[u]. Those values are also summed per edge, so no second traversal is needed.
+    Edge betweenness is normalized by n * (n - 1), the number of ordered pairs of nodes, while node
+    betweenness is normalized by (n - 1) * (n - 2), the pairs a node can lie between, since a node is
+    not counted on paths it ends. The two are not on the same scale: for an edge and a node, compare
+    edge betweenness with node betweenness * (n - 2) / n. Both follow NetworkX's normalization
+    """
+
+    start = time.time()
+    csr = adjGraph.csr
+    totals = traverseSources(csr, np.arange(len(csr)), ("betweenness", "edgeBetweenness"), workers=workers)
+    betweenness_centrality = csr.toDict(finalizeMeasure("betweenness", totals, len(csr)))
+    edge_betweenness = csr.edgesToDict(finalizeMeasure("edgeBetweenness", totals, len(csr)))
+    diff = time.time() - start
+    return (betweenness_centrality, edge_betweenness, diff)
+
+
+def approximateBetweenness(adjGraph, nodeFrac=None, epsilon=None, delta=0.1, seed=None, workers=1):
+    """
+    Estimate betweenness centrality of all nodes by sampling, instead of running
+    Brandes' algorithm from every node
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Graph object for which centrality needs to be computed
+
+    nodeFrac: float, default = None
+        Fixed sample mode. Run Brandes' algorithm from this fraction of nodes (pivots),
+        picked uniformly at random, and scale the summed dependencies by n / #pivots
+
+    epsilon: float, default = None
+        Adaptive mode, used when nodeFrac is None. Largest allowed absolute error of any
+        node's (normalized) betweenness. The sample size follows Riondato and Kornaropoulos,
+        see `_riondatoKornaropoulos`
+
+    delta: float, default = 0.1
+        Adaptive mode: probability with which the error may exceed epsilon.
+        Fixed sample mode: 1 - delta is the confidence level of the reported error
+
+    seed: int, default = None
+        Seed for the random sampling
+
+    workers: int, default = 1
+        Number of processes used in fixed sample mode. Adaptive mode draws one path per sampled
+        pair, each after a single BFS, and always runs in this process
+    ----------
+
+    Returns
+    -------
+    betweenness_centrality : dict
+        Dictionary with node ID as key and estimated betweenness centrality being value,
+        normalized as in `betweennessCentrality`
+
+    error: dict
+        'mode': "pivots" or "adaptive"
+        'samples': number of pivots or sampled node pairs
+        'epsilon': estimated (fixed sample) or guaranteed (adaptive) bound on the absolute error of any node
+        'delta': probability that the error of some node exceeds epsilon
+
+    diff: float
+       time taken to estimate betweenness for all nodes
+    ----------
+
+    Fixed sample mode keeps per-node sums of squared dependencies as well. The reported epsilon is
+    the largest normal-approximation confidence interval over all nodes, with a finite population
+    correction since pivots are drawn without replacement. Every interval is taken at confidence
+    1 - delta / n, so by the union bound all nodes are within epsilon together with probability at
+    least 1 - delta (as far as the normal approximation holds). It is exact (0) when nodeFrac is 1
+    """
+
+    if nodeFrac is None and epsilon is None:
+        raise ValueError("Either nodeFrac or epsilon is required")
+
+    start = time.time()
+    csr = adjGraph.csr
+    n = len(csr)
+    rng = np.random.default_rng(seed)
+    normalizationConstant = 1 / ((n - 1) * (n - 2)) if n > 2 else 0.0
+
+    if nodeFrac is not None:
+        k = min(n, max(1, int(round(nodeFrac * n))))
+        pivots = np.sort(rng.choice(n, size=k, replace=False))
+
+        totals = traverseSources(csr, pivots, ("betweenness",), workers=workers, squares=True)
+        sums, sumSquares = totals['betweenness'], totals['betweennessSquares']
+
+        betweenness = sums * (n / k) * normalizationConstant
+
+        # Standard error of n * mean(dependency), with finite population correction
+        variance = np.maximum(sumSquares / k - (sums / k) ** 2, 0.0) * k / max(k - 1, 1)
+        stdErr = n * np.sqrt(variance / k * (1 - k / n)) * normalizationConstant
+        # Two-sided normal quantile for delta / n, so the interval holds for all n nodes at once
+        z = np.sqrt(2) * erfinv(1 - delta / n)
+        error = {'mode': "pivots", 'samples': k, 'epsilon': float(z * stdErr.max()), 'delta': delta}
+    else:
+        r = _riondatoKornaropoulos(csr, epsilon, delta)
+        betweenness = _samplePaths(csr, r, rng)
+        # Riondato and Kornaropoulos normalize by n(n - 1) pairs, we normalize by (n - 1)(n - 2)
+        scale = n / (n - 2) if n > 2 else 0.0
+        betweenness *= scale
+        error = {'mode': "adaptive", 'samples': r, 'epsilon': epsilon * scale, 'delta': delta}
+
+    betweenness_centrality = csr.toDict(betweenness)
+    diff = time.time() - start
+    return (betweenness_centrality, error, diff)
+
+
+def _riondatoKornaropoulos(csr, epsilon, delta, c=0.5):
+    """
+    Sample size r = (c / epsilon^2) * (floor(log2(VD - 2)) + 1 + ln(1 / delta)) from
+    Riondato and Kornaropoulos, "Fast approximation of betweenness centrality through sampling"
+
+    VD, the vertex diameter, is the largest number of nodes on a shortest path. For undirected
+    graphs it is bounded from above with one BFS per connected component: any shortest path in a
+    component has at most 2 * eccentricity(x) + 1 nodes for any x in it. A directed shortest path
+    can be longer than that, so for directed graphs VD is bounded by the number of nodes of the
+    largest weakly connected component instead. Only log2(VD) enters r, so a loose bound costs
+    few extra samples
+    """
+
+    n = len(csr)
+    vertexDiameter = 2
+    if csr.is_directed:
+        adjacency = csr_matrix((np.ones(len(csr.indices), dtype=np.int8), csr.indices, csr.indptr), shape=(n, n))
+        _, labels = connected_components(adjacency, directed=True, connection="weak")
+        if n:
+            vertexDiameter = max(vertexDiameter, int(np.bincount(labels).max()))
+    else:
+        visited = np.zeros(n, dtype=bool)
+        workspace = traversalWorkspace(n)
+
+        for s in range(n):
+            if visited[s]:
+                continue
+            _, levelSizes = shortestPathDAG(csr, s, workspace, keepDAG=False)
+            visited |= workspace['distances'] >= 0
+            eccentricity = len(levelSizes)
+            vertexDiameter = max(vertexDiameter, min(2 * eccentricity + 1, 1 + sum(levelSizes)))
+
+    vcBound = np.floor(np.log2(vertexDiameter - 2)) + 1 if vertexDiameter > 2 else 1
+    return int(np.ceil(c / epsilon ** 2 * (vcBound + np.log(1 / delta))))
+
+
+def _samplePaths(csr, r, rng):
+    """
+    Riondato-Kornaropoulos estimator: for r uniformly random node pairs (s, t), pick one
+    shortest s-t path uniformly at random and credit 1 / r to every node inside it
+
+    The forward BFS is `shortestPathDAG`. The path is drawn backwards from t, moving
+    to a DAG predecessor u of the current node v with probability pathCounts[u] / pathCounts[v]
+    """
+
+    n = len(csr)
+    betweenness = np.zeros(n)
+    workspace = traversalWorkspace(n)
+    distances = workspace['distances']
+    pathCounts = workspace['pathCounts']
+
+    for _ in range(r):
+        s, t = rng.choice(n, size=2, replace=False)
+        dagLevels, _ = shortestPathDAG(csr, s, workspace)
+        if distances[t] < 0:
+            continue
+
+        v = t
+        while distances[v] > 1:
+            sources, targets = dagLevels[distances[v] - 1]
+            parents = sources[targets == v]
+            weights = pathCounts[parents]
+            v = parents[rng.choice(len(parents), p=weights / weights.sum())]
+            betweenness[v] += 1 / r
+
+    return betweenness
@@ -0,0 +1,121 @@
+"""
+Checkpoints for long all-sources traversals
+
+A `Checkpoint` is handed to `src.traversal.traverseSources` (and the
+functions built on it, e.g. `betweennessCentrality`). Every `every` sources
+or `seconds` seconds, whichever comes first, the partial sums and the
+number of finished sources are written to one .npz file. The file is
+written next to its final path and renamed over it, so an interrupted
+write never leaves a damaged checkpoint behind.
+
+Running the same computation again with the same checkpoint path skips the
+sources that are already done and continues from the saved sums. Sources
+are processed and added up in the same order as in an uninterrupted run,
+so the results are identical. The file is removed once the run completes
+"""
+import hashlib
+import os
+import time
+
+import numpy as np
+
+
+class Checkpoint:
+
+    def __init__(self, path, every=1000, seconds=600.0):
+        """
+        Parameters
+        ----------
+        path: str or pathlib.Path
+            File to save to and resume from
+
+        every: int, default = 1000
+            Save after this many newly finished sources
+
+        seconds: float, default = 600.0
+            Save when this much time has passed since the last save
+        ----------
+        """
+
+        self.path = str(path)
+        self.every = every
+        self.seconds = seconds
+        self._key = None
+        self._savedDone = 0
+        self._savedAt = time.monotonic()
+
+    @staticmethod
+    def runKey(csr, sources, measures, squares):
+        """
+        Identifies a computation, so that a checkpoint is never resumed into a different one
+        """
+
+        digest = hashlib.sha1()
+        for array in (csr.indptr, csr.indices, csr.nodeIDs, np.asarray(sources, dtype=np.int64)):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return f"{digest.hexdigest()} {csr.is_directed} {','.join(sorted(measures))} {squares}"
+
+    def resume(self, key):
+        """
+        Start tracking the computation `key`
+
+        Returns
+        -------
+        done: int
+            Number of sources finished in the saved run, 0 if there is no checkpoint
+
+        totals: dict
+            Saved partial sums, None if there is no checkpoint
+
+        chunks: int
+            Number of chunks the saved run split sources into, 0 if it ran serially
+        ----------
+        """
+
+        self._key = key
+        self._savedAt = time.monotonic()
+        if not os.path.exists(self.path):
+            self._savedDone = 0
+            return 0, None, 0
+
+        with np.load(self.path, allow_pickle=False) as saved:
+            if str(saved['key']) != key:
+                raise ValueError(f"Checkpoint {self.path} was saved by a different computation")
+            done = int(saved['done'])
+            chunks = int(saved['chunks'])
+            totals = {name[len("totals."):]: saved[name] for name in saved.files if name.startswith("totals.")}
+
+        self._savedDone = done
+        return done, totals, chunks
+
+    def progress(self, done, totals, chunks=0):
+        """
+        Save if enough sources or time have passed since the last save
+        """
+
+        if done - self._savedDone >= self.every or time.monotonic() - self._savedAt >= self.seconds:
+            self.save(done, totals, chunks)
+
+    def save(self, done, totals, chunks=0):
+        """
+        Atomically replace the checkpoint with `done` finished sources and their sums `totals`
+        """
+
+        arrays = {f"totals.{name}": values for name, values in totals.items()}
+        temporaryPath = self.path + ".tmp"
+        with open(temporaryPath, "wb") as f:
+            np.savez(f, key=np.array(self._key), done=np.array(done), chunks=np.array(chunks), **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaryPath, self.path)
+
+        self._savedDone = done
+        self._savedAt = time.monotonic()
+
+    def finish(self):
+        """
+        Remove the checkpoint of a completed computation
+        """
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
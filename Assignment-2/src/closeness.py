@@ -1,7 +1,16 @@
+import heapq
 import time
 
+import numpy as np
 
-def closenessCentrality(adjGraph):
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from src import instrument
+from src.traversal import finalizeMeasure, traverseSources
+
+
+def closenessCentrality(adjGraph, backend="dict", batchSize=64):
     """
     Compute closeness centrality for all nodes of a graph
 
@@ -9,6 +18,14 @@ def closenessCentrality(adjGraph):
     ----------
     adjGraph: src.graph.AdjGraph
         Graph object for which centrality needs to be computed
+
+    backend: str, default = "dict"
+        "dict" runs BFS over the dictionary adjacency `adjGraph.adj`
+        "csr" runs a vectorized BFS over the CSR arrays `adjGraph.csr`
+        "msbfs" runs bit-parallel BFS from batchSize sources at a time, see `multiSourceBFS`
+
+    batchSize: int, default = 64
+        Sources per traversal for the "msbfs" backend, rounded up to a multiple of 64
     ----------
 
     Returns
@@ -29,11 +46,24 @@ def closenessCentrality(adjGraph):
     """
 
     start = time.time()
+
+    if backend in ("csr", "msbfs"):
+        if backend == "csr":
+            closeness_centrality = _csrCloseness(adjGraph.csr)
+        else:
+            closeness_centrality = _msbfsCloseness(adjGraph.csr, batchSize)
+        diff = time.time() - start
+        return (closeness_centrality, diff)
+    elif backend != "dict":
+        raise ValueError(f"Unknown backend {backend}")
+
     graph = adjGraph.SNAPGraph
     closeness_centrality = {}
 
     for node in graph.Nodes():
-        nDist = allNodesDistance(adjGraph, node)
+        with instrument.phase("closeness.bfs"):
+            nDist = allNodesDistance(adjGraph, node)
+        instrument.count("closeness.sources")
         distSum = sum(nDist.values())
 
         if distSum == 0:
@@ -115,3 +145,229 @@ def BFS(adjGraph, source):
             # Add neighbours of present elements to iterate over in the next level
             neighbourList.update(adj[v])
         currentLevel += 1
+
+
+def _csrCloseness(csr):
+    """
+    Closeness centrality of every node of a src.graph.CSRGraph
+    Same definition as `closenessCentrality`, with one BFS per node from `src.traversal`
+    """
+
+    totals = traverseSources(csr, np.arange(len(csr)), ("closeness",))
+    return csr.toDict(finalizeMeasure("closeness", totals, len(csr)))
+
+
+def _msbfsCloseness(csr, batchSize=64):
+    """
+    Closeness centrality of every node of a src.graph.CSRGraph using `multiSourceBFS`
+    """
+
+    n = len(csr)
+    width = max(64, -(-batchSize // 64) * 64)
+    closeness = np.zeros(n)
+    # Bits flow from a node to its out-neighbours, so each node gathers over its in-neighbours
+    incoming = csr.transpose()
+
+    for batch in range(0, n, width):
+        sources = np.arange(batch, min(batch + width, n))
+        with instrument.phase("closeness.msbfs"):
+            reached, distSum = multiSourceBFS(incoming, sources)
+        instrument.count("closeness.sources", len(sources))
+        nonzero = distSum > 0
+        closeness[sources[nonzero]] = (reached[nonzero] - 1) / distSum[nonzero]
+
+    return csr.toDict(closeness)
+
+
+def multiSourceBFS(incoming, sources, chunkEdges=1 << 22):
+    """
+    Bit-parallel BFS from many sources at once (MS-BFS, Then et al., VLDB 2015)
+
+    Parameters
+    ----------
+    incoming: src.graph.CSRGraph
+        Graph whose rows hold the in-neighbours of every node
+        (the graph itself if undirected, `CSRGraph.transpose` otherwise)
+
+    sources: numpy.ndarray
+        Indices (not IDs) of the starting nodes
+
+    chunkEdges: int, default = 1 << 22
+        Number of edges gathered per NumPy call, bounding temporary memory
+    ----------
+
+    Returns
+    -------
+    reached: numpy.ndarray
+        For every source, the number of nodes reachable from it, including itself
+
+    distSum: numpy.ndarray
+        For every source, the sum of distances to all nodes reachable from it
+    ----------
+
+    Each node holds one bit per source packed into 64-bit words: `seen` marks sources
+    that reached the node, `visit` the sources whose BFS frontier contains it. A level is
+    one pass over the adjacency: a node's next `visit` word is the OR of its in-neighbours'
+    `visit` words minus its `seen` word. Newly set bits are counted per source with
+    np.unpackbits, so one traversal serves all sources in the batch
+    """
+
+    n = len(incoming)
+    k = len(sources)
+    words = -(-k // 64)
+
+    seen = np.zeros((n, words), dtype=np.uint64)
+    positions = np.arange(k)
+    np.bitwise_or.at(seen, (sources, positions // 64),
+                     np.left_shift(np.uint64(1), (positions % 64).astype(np.uint64)))
+    visit = seen.copy()
+
+    reached = np.ones(k, dtype=np.int64)
+    distSum = np.zeros(k, dtype=np.int64)
+
+    # Split rows with at least one in-neighbour into blocks of about chunkEdges edges
+    rows = np.flatnonzero(incoming.degrees > 0)
+    blockEnds = np.searchsorted(incoming.indptr[rows + 1], np.arange(chunkEdges, incoming.edgeCount, chunkEdges))
+    blocks = np.split(rows, np.unique(blockEnds))
+
+    level = 0
+    while True:
+        level += 1
+        nextVisit = np.zeros_like(visit)
+        for block in blocks:
+            if not len(block):
+                continue
+            first, last = incoming.indptr[block[0]], incoming.indptr[block[-1] + 1]
+            gathered = visit[incoming.indices[first:last]]
+            nextVisit[block] = np.bitwise_or.reduceat(gathered, incoming.indptr[block] - first, axis=0)
+
+        nextVisit &= ~seen
+        active = np.flatnonzero(nextVisit.any(axis=1))
+        if not len(active):
+            break
+
+        seen[active] |= nextVisit[active]
+        visit = nextVisit
+
+        bits = np.unpackbits(nextVisit[active].astype("<u8").view(np.uint8), axis=1, bitorder="little")
+        counts = bits.sum(axis=0, dtype=np.int64)[:k]
+        reached += counts
+        distSum += level * counts
+
+    return reached, distSum
+
+
+def topKCloseness(adjGraph, k=100):
+    """
+    Compute the k nodes with the highest closeness centrality without a full BFS from every node
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Graph object for which centrality needs to be computed
+
+    k: int, default = 100
+        Number of top nodes wanted, at least 1
+    ----------
+
+    Returns
+    -------
+    topK: list
+        (node ID, closeness centrality) tuples of the top k nodes, highest first.
+        Values are exactly those `closenessCentrality` computes
+
+    diff: float
+       time taken to find the top k nodes
+    ----------
+
+    Follows the BFSCut idea of Bergamini et al., "Computing top-k closeness centrality faster in
+    unweighted graphs". Nodes are processed by decreasing degree. During each BFS, after level d,
+    the visited nodes have a known distance sum and every node of the connected component still
+    unvisited is at distance d + 1 or more. At most sum(deg(u) - 1) of them, over u in the level d
+    frontier, can be at distance d + 1 exactly. This gives a lower bound on the distance sum
+    and so an upper bound on closeness. Once that bound falls below the k-th best closeness
+    found so far, the BFS stops early. Closeness uses the component size as reachable count,
+    which is only known in advance for undirected graphs, so directed graphs run without cuts
+    """
+
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+
+    start = time.time()
+    csr = adjGraph.csr
+    n = len(csr)
+    degrees = csr.degrees
+
+    if csr.is_directed:
+        componentSize = None
+    else:
+        _, labels = connected_components(_adjacencyMatrix(csr), directed=False)
+        componentSize = np.bincount(labels)[labels]
+
+    # Every BFS resets the nodes it reached, so the array is filled only once
+    distances = np.full(n, -1, dtype=np.int64)
+    heap = []
+
+    for s in np.argsort(-degrees, kind="stable").tolist():
+        threshold = heap[0][0] if len(heap) == k else None
+        value = _cutBFS(csr, s, distances, degrees,
+                        None if componentSize is None else int(componentSize[s]), threshold)
+        instrument.count("closeness.sources")
+        if value is None:
+            instrument.count("closeness.cutSources")
+            continue
+
+        item = (value, -int(csr.nodeIDs[s]))
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    topK = [(-negID, value) for value, negID in sorted(heap, reverse=True)]
+    diff = time.time() - start
+    return (topK, diff)
+
+
+def _cutBFS(csr, source, distances, degrees, componentSize, threshold):
+    """
+    BFS from source for `topKCloseness`. Returns the closeness of source, or None
+    if the upper bound shows it cannot exceed threshold
+    distances must be -1 everywhere on entry, and is again on return: only the nodes
+    this BFS reached are reset, so a BFS that is cut early costs only what it visited
+    """
+
+    distances[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    reached = [frontier]
+    reachedCount, distSum, level = 1, 0, 0
+    closeness = None
+
+    while len(frontier):
+        if threshold is not None and componentSize is not None and componentSize > 1:
+            remaining = componentSize - reachedCount
+            # Every frontier node except the source has at least one edge back towards the source
+            nextLevel = int(degrees[frontier].sum()) - (len(frontier) if level else 0)
+            atNext = min(remaining, nextLevel)
+            lowerBound = distSum + (level + 1) * atNext + (level + 2) * (remaining - atNext)
+            if lowerBound > 0 and (componentSize - 1) / lowerBound < threshold:
+                break
+
+        level += 1
+        _, targets = csr.expand(frontier)
+        frontier = np.unique(targets[distances[targets] < 0])
+        distances[frontier] = level
+        reached.append(frontier)
+        reachedCount += len(frontier)
+        distSum += level * len(frontier)
+    else:
+        closeness = (reachedCount - 1) / distSum if distSum > 0 else 0.0
+
+    # Reset only the nodes this BFS touched
+    for nodes in reached:
+        distances[nodes] = -1
+    return closeness
+
+
+def _adjacencyMatrix(csr):
+    n = len(csr)
+    return csr_matrix((np.ones(csr.edgeCount, dtype=np.int8), csr.indices, csr.indptr), shape=(n, n))
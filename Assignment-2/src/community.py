@@ -0,0 +1,165 @@
+import time
+
+import numpy as np
+
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from src import instrument
+from src.graph import CSRGraph
+from src.traversal import traverseSources
+
+
+def girvanNewman(adjGraph, communities=None, workers=1):
+    """
+    Detect communities by repeatedly removing the edge with the highest edge betweenness (Girvan and Newman, 2002)
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Undirected graph to find communities in
+
+    communities: int, default = None
+        Stop as soon as the graph falls apart into this many connected components and return them.
+        If None, remove all edges and return the split with the highest modularity
+
+    workers: int, default = 1
+        Number of processes used for every edge betweenness computation
+    ----------
+
+    Returns
+    -------
+    partition: list
+        Communities as sets of node IDs
+
+    modularities: list
+        Modularity after every split, starting with the connected components of the graph
+
+    diff: float
+       time taken to find the communities
+    ----------
+
+    Edge betweenness comes from `src.traversal.traverseSources`, which credits the edges during
+    the dependency accumulation of Brandes' algorithm. Shortest paths never leave a connected
+    component, so removing an edge only changes the betweenness of edges in the component that
+    held it. After each removal only that component is traversed again, from its own nodes, and
+    all other values are kept. Values are unnormalized sums over all sources, the same as a full
+    recomputation would give, so edges of different components compare correctly
+    """
+
+    start = time.time()
+    csr = adjGraph.csr
+    if csr.is_directed:
+        raise ValueError("Girvan-Newman community detection needs an undirected graph")
+
+    n = len(csr)
+    rows = np.repeat(np.arange(n), csr.degrees)
+    # One entry per undirected edge (u < v), sorted by (u, v). Self loops are never on a shortest path
+    stored = rows < csr.indices
+    edgeU, edgeV = rows[stored], csr.indices[stored].astype(np.int64)
+    edgeKeys = edgeU * n + edgeV
+    alive = np.ones(len(edgeU), dtype=bool)
+
+    componentCount, labels = connected_components(_adjacencyMatrix(n, edgeU, edgeV), directed=False)
+    scores = np.zeros(len(edgeU))
+    _addEdgeScores(scores, csr, np.arange(n), edgeKeys, n, workers)
+
+    modularities = [_modularity(labels, edgeU, edgeV)]
+    best, bestModularity = labels.copy(), modularities[0]
+
+    while alive.any() and (communities is None or componentCount < communities):
+        removed = int(np.argmax(np.where(alive, scores, -np.inf)))
+        alive[removed] = False
+        scores[removed] = 0.0
+        instrument.count("community.removedEdges")
+
+        # Rebuild only the component that held the removed edge
+        component = labels[edgeU[removed]]
+        nodes = np.flatnonzero(labels == component)
+        inside = alive & (labels[edgeU] == component)
+        sub = CSRGraph.fromEdges(edgeU[inside], edgeV[inside], nodeIDs=nodes)
+
+        subRows = np.repeat(np.arange(len(sub)), sub.degrees)
+        pieces, subLabels = connected_components(_adjacencyMatrix(len(sub), subRows, sub.indices), directed=False)
+        if pieces > 1:
+            split = subLabels > 0
+            labels[nodes[split]] = componentCount + subLabels[split] - 1
+            componentCount += pieces - 1
+
+        scores[inside] = 0.0
+        with instrument.phase("community.edgeBetweenness"):
+            _addEdgeScores(scores, sub, nodes, edgeKeys, n, workers)
+
+        if pieces > 1:
+            modularities.append(_modularity(labels, edgeU, edgeV))
+            if communities is None and modularities[-1] > bestModularity:
+                best, bestModularity = labels.copy(), modularities[-1]
+
+    if communities is not None:
+        best = labels
+    nodeIDs = csr.nodeIDs
+    partition = [set(nodeIDs[best == c].tolist()) for c in range(best.max() + 1)] if n else []
+    diff = time.time() - start
+    return (partition, modularities, diff)
+
+
+def modularity(adjGraph, partition):
+    """
+    Newman's modularity of a partition of an undirected graph into communities
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Undirected graph
+
+    partition: list
+        Communities as sets of node IDs, covering every node once
+    ----------
+
+    Returns
+    -------
+    _: float
+        Sum over communities c of L_c / m - (D_c / 2m)^2, where L_c is the number of edges inside c,
+        D_c the sum of degrees in c and m the number of edges. Self loops are left out
+    ----------
+    """
+
+    csr = adjGraph.csr
+    labels = np.empty(len(csr), dtype=np.int64)
+    for c, nodes in enumerate(partition):
+        labels[csr.indexArray(list(nodes))] = c
+
+    rows = np.repeat(np.arange(len(csr)), csr.degrees)
+    stored = rows < csr.indices
+    return _modularity(labels, rows[stored], csr.indices[stored])
+
+
+def _addEdgeScores(scores, csr, nodes, edgeKeys, n, workers):
+    """
+    Add the unnormalized edge betweenness of every edge of csr, whose node i is node nodes[i] of
+    the full graph, to scores. Both stored directions of an undirected edge go to its one entry
+    """
+
+    totals = traverseSources(csr, np.arange(len(csr)), ("edgeBetweenness",), workers=workers)
+    sources = nodes[np.repeat(np.arange(len(csr)), csr.degrees)]
+    targets = nodes[csr.indices]
+    # Self loops have no entry in scores (and no betweenness)
+    loops = sources == targets
+    edges = np.searchsorted(edgeKeys, np.minimum(sources, targets) * n + np.maximum(sources, targets))
+    np.add.at(scores, edges[~loops], totals['edgeBetweenness'][~loops])
+
+
+def _modularity(labels, edgeU, edgeV):
+    m = len(edgeU)
+    if not m:
+        return 0.0
+
+    communities = labels.max() + 1
+    inside = labels[edgeU] == labels[edgeV]
+    internal = np.bincount(labels[edgeU[inside]], minlength=communities)
+    degrees = np.bincount(labels[edgeU], minlength=communities) + np.bincount(labels[edgeV], minlength=communities)
+    return float((internal / m - (degrees / (2 * m)) ** 2).sum())
+
+
+def _adjacencyMatrix(n, sources, targets):
+    return csr_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n, n))
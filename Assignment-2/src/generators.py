@@ -0,0 +1,91 @@
+"""
+Seeded synthetic graphs for benchmarks
+
+Every generator returns a src.graph.CSRGraph of an undirected simple graph
+with node IDs 0..n-1. The same arguments and seed always give the same graph
+"""
+import numpy as np
+
+from src.graph import CSRGraph
+
+
+def erdosRenyi(n, averageDegree=10, seed=0):
+    """
+    Erdos-Renyi style random graph with about n * averageDegree / 2 edges
+
+    Parameters
+    ----------
+    n: int
+        Number of nodes
+
+    averageDegree: float, default = 10
+        Expected average degree
+
+    seed: int, default = 0
+        Seed for the random generator
+    ----------
+
+    Edges are drawn as uniform random node pairs (G(n, m) with replacement).
+    Self loops are dropped and repeated pairs merged, which removes a negligible
+    fraction of edges for sparse graphs
+    """
+
+    rng = np.random.default_rng(seed)
+    m = int(n * averageDegree / 2)
+    sources = rng.integers(0, n, size=m)
+    targets = rng.integers(0, n, size=m)
+    keep = sources != targets
+    return CSRGraph.fromEdges(sources[keep], targets[keep], nodeIDs=np.arange(n))
+
+
+def barabasiAlbert(n, m=5, seed=0):
+    """
+    Barabasi-Albert preferential attachment graph
+
+    Parameters
+    ----------
+    n: int
+        Number of nodes
+
+    m: int, default = 5
+        Edges added with every new node
+
+    seed: int, default = 0
+        Seed for the random generator
+    ----------
+
+    Starts from a clique on m + 1 nodes. Every new node links to m distinct existing
+    nodes picked with probability proportional to their degree, by sampling from the
+    list of all edge endpoints so far
+    """
+
+    rng = np.random.default_rng(seed)
+    core = np.arange(m + 1)
+    sources = [u for u in core for v in core if u < v]
+    targets = [v for u in core for v in core if u < v]
+    endpoints = sources + targets
+
+    for node in range(m + 1, n):
+        chosen = set()
+        while len(chosen) < m:
+            chosen.add(endpoints[rng.integers(len(endpoints))])
+        for v in chosen:
+            sources.append(node)
+            targets.append(v)
+            endpoints.append(node)
+            endpoints.append(v)
+
+    return CSRGraph.fromEdges(np.array(sources), np.array(targets), nodeIDs=np.arange(n))
+
+
+def grid(rows, cols=None):
+    """
+    rows x cols lattice where each node links to its right and lower neighbours
+    A square grid is built if cols is None. Node (i, j) has ID i * cols + j
+    """
+
+    cols = rows if cols is None else cols
+    ids = np.arange(rows * cols).reshape(rows, cols)
+    sources = np.concatenate((ids[:, :-1].ravel(), ids[:-1, :].ravel()))
+    targets = np.concatenate((ids[:, 1:].ravel(), ids[1:, :].ravel()))
+    return CSRGraph.fromEdges(sources, targets, nodeIDs=ids.ravel())
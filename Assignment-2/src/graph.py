@@ -3,9 +3,20 @@ AdjGraph built from SNAP's TUNGraph class
 Creates an adjacency view list of the graph and provides
 access via index to make it easier to use graph[s] to refer
 to node s of the graph instead of calling the graph.GetNI(s) method
+
+Alongside the dictionary view, a compact CSR (compressed sparse row) view
+is available through AdjGraph.csr. Node IDs are remapped to 0..n-1 and the
+neighbours of every node are stored contiguously in NumPy arrays
+
+AdjGraph.fromBinary memory-maps a graph file written by src.graphfile, in which
+case the SNAP graph is only built if something asks for AdjGraph.SNAPGraph
 """
+import numpy as np
+
 from snap import PUNGraph, PNGraph, LoadEdgeList
 
+from src import instrument
+
 
 class AdjGraph:
 
@@ -48,12 +59,115 @@ class AdjGraph:
         else:
             base = PNGraph
 
-        self._graph = LoadEdgeList(base, edgeListFilePath,
-                                   srcColumnId, destColumnId, separator)
+        with instrument.phase("graph.LoadEdgeList"):
+            graph = LoadEdgeList(base, edgeListFilePath,
+                                 srcColumnId, destColumnId, separator)
+        self._setGraph(graph, directed)
+
+    @classmethod
+    def fromSNAPGraph(cls, graph, directed=False, csr=None):
+        """
+        Wrap an already loaded SNAP graph instead of parsing an edge list
+        Parameters
+        ----------
+        graph: snap.PUNGraph or snap.PNGraph
+            Loaded SNAP graph
+
+        directed: bool, default = False
+            Whether graph is a directed graph
+
+        csr: src.graph.CSRGraph, default = None
+            Precomputed CSR view of graph, built on first access if None
+        ----------
+        """
+
+        adjGraph = cls.__new__(cls)
+        adjGraph._setGraph(graph, directed)
+        adjGraph._csr = csr
+        return adjGraph
+
+    @classmethod
+    def fromBinary(cls, graphFilePath, snapGraphPath=None):
+        """
+        Open a graph file written by `src.graphfile.writeGraphFile` without copying it
+        Parameters
+        ----------
+        graphFilePath: str or pathlib.Path
+            Path of the binary graph file. Its arrays are memory-mapped read-only,
+            so concurrent processes opening the same file share its pages
+
+        snapGraphPath: str or pathlib.Path, default = None
+            SNAP binary serialization of the same graph, loaded on first access of
+            SNAPGraph. If None, the SNAP graph is rebuilt from the CSR arrays instead
+        ----------
+
+        Examples
+        ----------
+        from src.graph import AdjGraph
+        adjGraph = AdjGraph.fromBinary("SNAP-DATA/facebook.csr")
+        closeness, _ = closenessCentrality(adjGraph, backend="msbfs")
+        """
+
+        from src.graphfile import readGraphFile
+
+        with instrument.phase("graph.readGraphFile"):
+            csr = readGraphFile(graphFilePath)
+        adjGraph = cls.fromCSR(csr)
+        adjGraph._snapGraphPath = snapGraphPath
+        return adjGraph
+
+    @classmethod
+    def fromCSR(cls, csr):
+        """
+        Wrap a CSRGraph, e.g. one built with `CSRGraph.fromEdges` or src.generators
+        The SNAP graph is rebuilt from the CSR arrays only if SNAPGraph is accessed
+        """
+
+        adjGraph = cls.__new__(cls)
+        adjGraph._setGraph(None, csr.is_directed)
+        adjGraph._csr = csr
+        adjGraph.maxNodeID = int(csr.nodeIDs[-1]) if len(csr) else 0
+        return adjGraph
+
+    def _setGraph(self, graph, directed):
+        self._graph = graph
         self.is_directed = directed
-        self.adj = self.getAdj()
-        self.SNAPGraph = self._graph
-        self.maxNodeID = self._maxNodeID()
+        self._adj = None
+        self._csr = None
+        self._snapGraphPath = None
+        self.maxNodeID = 0
+        if graph is not None:
+            with instrument.phase("graph.maxNodeID"):
+                self.maxNodeID = self._maxNodeID()
+
+    @property
+    def SNAPGraph(self):
+        """
+        The underlying SNAP graph. For graphs opened with `fromBinary` it is
+        loaded (or rebuilt from the CSR arrays) on first access
+        """
+
+        if self._graph is None:
+            with instrument.phase("graph.loadSNAPGraph"):
+                self._graph = self._loadSNAPGraph()
+        return self._graph
+
+    def _loadSNAPGraph(self):
+        if self._snapGraphPath is not None:
+            from snap import TUNGraph, TNGraph, TFIn
+
+            base = TNGraph if self.is_directed else TUNGraph
+            return base.Load(TFIn(str(self._snapGraphPath)))
+
+        csr = self._csr
+        graph = (PNGraph if self.is_directed else PUNGraph).New()
+        for nodeID in csr.nodeIDs.tolist():
+            graph.AddNode(nodeID)
+        sources, targets = csr.expand(np.arange(len(csr)))
+        for u, v in zip(csr.nodeIDs[sources].tolist(), csr.nodeIDs[targets].tolist()):
+            if self.is_directed or u <= v:
+                graph.AddEdge(u, v)
+        return graph
 
     def __len__(self):
         """
@@ -61,6 +175,9 @@ class AdjGraph:
         len(g) where g is an object of AdjGraph will return the number of nodes in the graph
         """
 
+        if self._graph is None:
+            return len(self._csr)
+
         n = self._graph.GetNodes()
         return n
 
@@ -78,12 +195,36 @@ class AdjGraph:
         """
 
         try:
-            return self._graph.GetNI(index)
+            return self.SNAPGraph.GetNI(index)
         except:
             raise KeyError(f"Node {index} not present")
 
     def fetchGraph(self):
-        return self._graph
+        return self.SNAPGraph
+
+    @property
+    def adj(self):
+        """
+        Dictionary adjacency view of the graph, built on first access
+        See `getAdj` for the layout
+        """
+
+        if self._adj is None:
+            with instrument.phase("graph.getAdj"):
+                self._adj = self.getAdj()
+        return self._adj
+
+    @property
+    def csr(self):
+        """
+        CSR view of the graph, built on first access
+        See `getCSR` and `CSRGraph` for the layout
+        """
+
+        if self._csr is None:
+            with instrument.phase("graph.getCSR"):
+                self._csr = self.getCSR()
+        return self._csr
 
     def getAdj(self):
         """
@@ -95,6 +236,12 @@ class AdjGraph:
         adj[200] will give all nodes that are neighbours of Node 200
         """
 
+        if self._graph is None:
+            csr = self._csr
+            nodeIDs = csr.nodeIDs.tolist()
+            return {nodeIDs[i]: {v: {} for v in csr.nodeIDs[csr.neighbours(i)].tolist()}
+                    for i in range(len(csr))}
+
         adj = {}
         subGraph = self._graph
         for node in subGraph.Nodes():
@@ -104,6 +251,71 @@ class AdjGraph:
                 adj[node.GetId()][v] = {}
         return adj
 
+    def getCSR(self):
+        """
+        Generate the CSR view of a graph
+
+        Returns
+        ----------
+        _: src.graph.CSRGraph
+            Graph with node IDs remapped to 0..n-1 in ascending order of ID.
+            For undirected graphs every edge is stored in both directions
+        ----------
+
+        For an edge list with m edges this takes O(n + m) machine words in
+        total instead of one Python dictionary per edge as `getAdj` does
+        """
+
+        sources = []
+        targets = []
+        for node in self._graph.Nodes():
+            u = node.GetId()
+            for v in node.GetOutEdges():
+                sources.append(u)
+                targets.append(v)
+
+        nodeIDs = np.array([node.GetId() for node in self._graph.Nodes()], dtype=np.int64)
+        # Out-edges already hold both directions of an undirected edge, so build it as directed
+        csr = CSRGraph.fromEdges(np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64),
+                                 directed=True, nodeIDs=nodeIDs)
+        csr.is_directed = self.is_directed
+        return csr
+
+    def updateEdges(self, added=(), removed=()):
+        """
+        Apply a batch of edge insertions and deletions to the graph
+        Parameters
+        ----------
+        added: list
+            (source ID, destination ID) pairs to insert. Unknown nodes are created
+
+        removed: list
+            (source ID, destination ID) pairs to delete. Nodes are kept even if
+            they lose all their edges, as with SNAP's DelEdge
+        ----------
+
+        The CSR view is rebuilt with `CSRGraph.withEdges` and the SNAP graph, if loaded,
+        is edited in place. Otherwise it is rebuilt from the new CSR view on next access
+        instead of being read from the SNAP file of the old graph. The dictionary view
+        is rebuilt on next access
+        """
+
+        self._csr = self.csr.withEdges(added, removed)
+        self._adj = None
+        self._snapGraphPath = None
+
+        if self._graph is not None:
+            for u, v in added:
+                for w in (u, v):
+                    if not self._graph.IsNode(w):
+                        self._graph.AddNode(w)
+                self._graph.AddEdge(u, v)
+            for u, v in removed:
+                if self._graph.IsEdge(u, v):
+                    self._graph.DelEdge(u, v)
+
+        self.maxNodeID = int(self._csr.nodeIDs[-1]) if len(self._csr) else 0
+
     def _maxNodeID(self):
         maxNodeID = 0
         for node in self._graph.Nodes():
@@ -111,3 +323,265 @@ class AdjGraph:
                 maxNodeID = node.GetId()
 
         return maxNodeID
+
+
+class CSRGraph:
+
+    def __init__(self, indptr, indices, nodeIDs, directed=False):
+        """
+        Compressed sparse row view of a graph
+        Parameters
+        ----------
+        indptr: numpy.ndarray
+            Array of n + 1 offsets. Neighbours of node i are indices[indptr[i]:indptr[i + 1]]
+
+        indices: numpy.ndarray
+            Concatenated neighbour lists, holding node indices in 0..n-1
+
+        nodeIDs: numpy.ndarray
+            Sorted original node IDs. nodeIDs[i] is the ID of node index i
+
+        directed: bool, default = False
+            If False, every edge is expected to be present in both directions
+        ----------
+
+        Examples
+        ----------
+        csr = adjGraph.csr
+        i = csr.index(200)  # Index of the node with ID 200
+        neighbours = csr.nodeIDs[csr.neighbours(i)]  # IDs of neighbours of Node 200
+        """
+
+        self.indptr = indptr
+        self.indices = indices
+        self.nodeIDs = nodeIDs
+        self.is_directed = directed
+        # Set by src.graphfile.readGraphFile when the arrays are memory-mapped from a file
+        self.path = None
+
+    def __len__(self):
+        return len(self.nodeIDs)
+
+    @property
+    def edgeCount(self):
+        """
+        Number of stored (directed) edges. An undirected edge counts twice
+        """
+
+        return len(self.indices)
+
+    @property
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    @property
+    def nbytes(self):
+        """
+        Memory held by the arrays of this graph in bytes
+        """
+
+        return self.indptr.nbytes + self.indices.nbytes + self.nodeIDs.nbytes
+
+    def index(self, nodeID):
+        """
+        Map an original node ID to its index in 0..n-1
+        Raises KeyError if the node is not present
+        """
+
+        i = int(np.searchsorted(self.nodeIDs, nodeID))
+        if i == len(self.nodeIDs) or self.nodeIDs[i] != nodeID:
+            raise KeyError(f"Node {nodeID} not present")
+        return i
+
+    def indexArray(self, nodeIDs):
+        """
+        Vectorized version of `index` for an array of node IDs
+        """
+
+        return indexNodeIDs(self.nodeIDs, nodeIDs)
+
+    def neighbours(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def expand(self, frontier, positions=False):
+        """
+        Fetch all edges leaving a set of nodes in one vectorized step
+
+        Parameters
+        ----------
+        frontier: numpy.ndarray
+            Node indices whose out-edges are wanted
+
+        positions: bool, default = False
+            Also return the position of every edge in `indices`, which identifies the edge
+        ----------
+
+        Returns
+        ----------
+        sources: numpy.ndarray
+            Source index of every edge
+
+        targets: numpy.ndarray
+            Target index of every edge, aligned with `sources`
+
+        offsets: numpy.ndarray
+            Only if positions is True. Position of every edge in `indices`
+        ----------
+        """
+
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        sources = np.repeat(frontier, counts)
+        # Position of every edge inside `indices`: start of its row plus its offset within the row
+        offsets = np.arange(len(sources), dtype=np.int64)
+        offsets += np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        if positions:
+            return sources, self.indices[offsets], offsets
+        return sources, self.indices[offsets]
+
+    def transpose(self):
+        """
+        CSRGraph with every edge reversed, so rows hold in-neighbours
+        Undirected graphs are their own transpose
+        """
+
+        if not self.is_directed:
+            return self
+
+        n = len(self)
+        sources = np.repeat(np.arange(n), self.degrees)
+        order = np.argsort(self.indices, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=n), out=indptr[1:])
+        return CSRGraph(indptr, sources[order].astype(self.indices.dtype), self.nodeIDs, directed=True)
+
+    def withEdges(self, added=(), removed=()):
+        """
+        New CSRGraph with a batch of edges inserted and deleted
+        Parameters
+        ----------
+        added: list
+            (source ID, destination ID) pairs to insert. Unknown nodes are created
+
+        removed: list
+            (source ID, destination ID) pairs to delete. All nodes are kept
+        ----------
+
+        For undirected graphs both directions of every edge are inserted or deleted
+        """
+
+        added = np.asarray(added, dtype=np.int64).reshape(-1, 2)
+        removed = np.asarray(removed, dtype=np.int64).reshape(-1, 2)
+        if not self.is_directed:
+            added = np.concatenate((added, added[:, ::-1]))
+            removed = np.concatenate((removed, removed[:, ::-1]))
+
+        sources, targets = self.expand(np.arange(len(self)))
+        sources = np.concatenate((self.nodeIDs[sources], added[:, 0]))
+        targets = np.concatenate((self.nodeIDs[targets], added[:, 1]))
+        nodeIDs = np.union1d(self.nodeIDs, added.ravel())
+
+        if len(removed):
+            # Encode (source, target) pairs as single integers over the new index space
+            n = len(nodeIDs)
+            keys = np.searchsorted(nodeIDs, sources) * n + np.searchsorted(nodeIDs, targets)
+            known = np.isin(removed, nodeIDs).all(axis=1)
+            removed = removed[known]
+            removedKeys = np.searchsorted(nodeIDs, removed[:, 0]) * n + np.searchsorted(nodeIDs, removed[:, 1])
+            keep = ~np.isin(keys, removedKeys)
+            sources, targets = sources[keep], targets[keep]
+
+        # Edges already hold both directions, so build as directed and restore the flag
+        csr = CSRGraph.fromEdges(sources, targets, directed=True, nodeIDs=nodeIDs)
+        csr.is_directed = self.is_directed
+        return csr
+
+    def toDict(self, values):
+        """
+        Convert an array of per-node values to a dictionary keyed by original node ID
+        """
+
+        return dict(zip(self.nodeIDs.tolist(), np.asarray(values).tolist()))
+
+    def edgesToDict(self, values):
+        """
+        Convert an array of per-edge values, aligned with `indices`, to a dictionary keyed
+        by (source ID, destination ID). For undirected graphs the two stored directions of
+        an edge are added up under the key (smaller ID, larger ID)
+        """
+
+        sources = np.repeat(self.nodeIDs, self.degrees)
+        targets = self.nodeIDs[self.indices]
+        values = np.asarray(values)
+        if not self.is_directed:
+            forward = sources <= targets
+            # Position of the reverse (v, u) of every stored edge (u, v): rows are sorted, so
+            # sorting edges by (target, source) lists the reverses in storage order
+            reverse = np.lexsort((sources, targets))
+            values = values + values[reverse]
+            sources, targets, values = sources[forward], targets[forward], values[forward]
+        return dict(zip(zip(sources.tolist(), targets.tolist()), values.tolist()))
+
+    @classmethod
+    def fromEdges(cls, sources, targets, directed=False, nodeIDs=None):
+        """
+        Build a CSRGraph from two aligned arrays of original node IDs
+
+        Parameters
+        ----------
+        sources: numpy.ndarray
+            Source node ID of every edge
+
+        targets: numpy.ndarray
+            Destination node ID of every edge
+
+        directed: bool, default = False
+            If False, every edge is also added in the reverse direction
+
+        nodeIDs: numpy.ndarray, default = None
+            IDs of all nodes, including isolated ones. Taken from the edges if None
+        ----------
+
+        Duplicate edges are dropped, so the result describes a simple graph like SNAP's
+        """
+
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if not directed:
+            sources, targets = np.concatenate((sources, targets)), np.concatenate((targets, sources))
+
+        if nodeIDs is None:
+            nodeIDs = np.concatenate((sources, targets))
+        nodeIDs = np.unique(np.asarray(nodeIDs, dtype=np.int64))
+        n = len(nodeIDs)
+
+        indexType = np.int32 if n < np.iinfo(np.int32).max else np.int64
+        src = np.searchsorted(nodeIDs, sources)
+        dst = np.searchsorted(nodeIDs, targets)
+
+        # Sort edges by (source, target) and drop repeated pairs
+        order = np.lexsort((dst, src))
+        src, dst = src[order], dst[order]
+        if len(src):
+            keep = np.ones(len(src), dtype=bool)
+            keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+            src, dst = src[keep], dst[keep]
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return cls(indptr, dst.astype(indexType), nodeIDs, directed=directed)
+
+
+def indexNodeIDs(sortedIDs, nodeIDs):
+    """
+    Positions of nodeIDs in the sorted array sortedIDs, e.g. the node IDs of a CSRGraph
+    or of a shard index. Raises KeyError for the first node ID that is not present
+    """
+
+    nodeIDs = np.asarray(nodeIDs, dtype=np.int64)
+    idx = np.searchsorted(sortedIDs, nodeIDs)
+    idx[idx == len(sortedIDs)] = 0
+    if len(nodeIDs) and not np.array_equal(sortedIDs[idx], nodeIDs):
+        missing = nodeIDs[sortedIDs[idx] != nodeIDs][0]
+        raise KeyError(f"Node {missing} not present")
+    return idx
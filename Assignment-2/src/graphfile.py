@@ -0,0 +1,186 @@
+"""
+Binary graph file: a CSRGraph laid out on disk so it can be memory-mapped
+
+All integers are little-endian. The file is a 128 byte header followed by
+three arrays, each starting at an offset that is a multiple of 8
+
+Header
+------
+offset  size  field
+0       8     magic, the bytes b"CSRGRAPH"
+8       4     uint32 format version, currently 1
+12      4     uint32 flags, bit 0 set for directed graphs
+16      8     uint64 n, number of nodes
+24      8     uint64 m, number of stored edges (undirected edges are stored twice)
+32      4     uint32 size in bytes of one entry of `indices`, 4 or 8
+36      4     reserved, zero
+40      8     uint64 offset of `nodeIDs`
+48      8     uint64 offset of `indptr`
+56      8     uint64 offset of `indices`
+64      40    ASCII hex digest identifying the source of the graph, or zeros
+104     24    reserved, zero
+
+Arrays
+------
+nodeIDs   int64[n]        sorted original node IDs, index i <-> nodeIDs[i]
+indptr    int64[n + 1]    neighbours of node i are indices[indptr[i]:indptr[i + 1]]
+indices   int32[m] or int64[m], node indices (not IDs)
+
+Convert an edge list with
+python -m src.graphfile <edge list> <graph file> [separator]
+"""
+import os
+import struct
+import sys
+
+import numpy as np
+
+from src.graph import CSRGraph
+
+MAGIC = b"CSRGRAPH"
+VERSION = 1
+HEADER = struct.Struct("<8sII QQ I4x QQQ 40s24x")
+DIRECTED_FLAG = 1
+
+
+def writeGraphFile(path, csr, source=""):
+    """
+    Write a CSRGraph to path in the binary graph format
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+        Destination file, written under a temporary name and renamed when complete
+
+    csr: src.graph.CSRGraph
+        Graph to write
+
+    source: str, default = ""
+        Up to 40 ASCII characters identifying where the graph came from (e.g. a hash of
+        the edge list), returned by `readGraphSource`
+    ----------
+    """
+
+    path = str(path)
+    n = len(csr)
+    m = csr.edgeCount
+    indices = csr.indices
+    if indices.dtype not in (np.int32, np.int64):
+        indices = indices.astype(np.int64)
+
+    nodeIDsOffset = _align(HEADER.size)
+    indptrOffset = _align(nodeIDsOffset + 8 * n)
+    indicesOffset = _align(indptrOffset + 8 * (n + 1))
+    header = HEADER.pack(MAGIC, VERSION, DIRECTED_FLAG if csr.is_directed else 0, n, m,
+                         indices.dtype.itemsize, nodeIDsOffset, indptrOffset, indicesOffset,
+                         source.encode("ascii")[:40])
+
+    with open(path + ".tmp", "wb") as f:
+        f.write(header)
+        for offset, array in ((nodeIDsOffset, csr.nodeIDs.astype("<i8")),
+                              (indptrOffset, csr.indptr.astype("<i8")),
+                              (indicesOffset, indices.astype(indices.dtype.newbyteorder("<")))):
+            f.write(b"\0" * (offset - f.tell()))
+            array.tofile(f)
+    os.replace(path + ".tmp", path)
+
+
+def readGraphFile(path):
+    """
+    Memory-map a binary graph file
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+        File written by `writeGraphFile`
+    ----------
+
+    Returns
+    ----------
+    csr: src.graph.CSRGraph
+        Graph whose arrays are read-only views into the mapped file. Nothing is
+        copied or parsed, so opening takes the same time for any graph size
+    ----------
+    """
+
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    header = _readHeader(data, path)
+    _, _, flags, n, m, itemSize, nodeIDsOffset, indptrOffset, indicesOffset, _ = header
+
+    nodeIDs = np.frombuffer(data, dtype="<i8", count=n, offset=nodeIDsOffset)
+    indptr = np.frombuffer(data, dtype="<i8", count=n + 1, offset=indptrOffset)
+    indices = np.frombuffer(data, dtype="<i4" if itemSize == 4 else "<i8", count=m, offset=indicesOffset)
+
+    csr = CSRGraph(indptr, indices, nodeIDs, directed=bool(flags & DIRECTED_FLAG))
+    csr.path = str(path)
+    return csr
+
+
+def readGraphSource(path):
+    """
+    Source string stored in the header of a binary graph file
+    """
+
+    with open(path, "rb") as f:
+        data = f.read(HEADER.size)
+    return _readHeader(data, path)[-1].rstrip(b"\0").decode("ascii")
+
+
+def convertEdgeList(elistPath, graphFilePath, directed=False, srcColumnId=0, destColumnId=1,
+                    separator='\t', source=""):
+    """
+    Convert a text edge list to a binary graph file, without going through SNAP
+
+    Parameters
+    ----------
+    elistPath: str or pathlib.Path
+        Edge list to convert. Lines starting with # are skipped
+
+    graphFilePath: str or pathlib.Path
+        Binary graph file to write
+
+    directed, srcColumnId, destColumnId, separator:
+        Same as in `src.graph.AdjGraph`
+
+    source: str, default = ""
+        Stored in the header, see `writeGraphFile`
+    ----------
+
+    Returns
+    ----------
+    csr: src.graph.CSRGraph
+        The graph that was written
+    ----------
+    """
+
+    delimiter = None if separator.isspace() else separator
+    edges = np.loadtxt(elistPath, dtype=np.int64, comments="#", delimiter=delimiter,
+                       usecols=(srcColumnId, destColumnId), ndmin=2)
+    csr = CSRGraph.fromEdges(edges[:, 0], edges[:, 1], directed=directed)
+    writeGraphFile(graphFilePath, csr, source=source)
+    return csr
+
+
+def _readHeader(data, path):
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a graph file")
+
+    header = HEADER.unpack(bytes(data[:HEADER.size]))
+    if header[0] != MAGIC:
+        raise ValueError(f"{path} is not a graph file")
+    if header[1] != VERSION:
+        raise ValueError(f"{path} has unsupported graph file version {header[1]}")
+    return header
+
+
+def _align(offset):
+    return -(-offset // 8) * 8
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        raise Exception("Usage: python -m src.graphfile <edge list> <graph file> [separator]")
+
+    separator = sys.argv[3] if len(sys.argv) > 3 else '\t'
+    csr = convertEdgeList(sys.argv[1], sys.argv[2], separator=separator)
+    print(f"Wrote {len(csr)} nodes and {csr.edgeCount} edges to {sys.argv[2]}")
@@ -0,0 +1,154 @@
+"""
+Instrumentation of the centrality pipeline
+
+The modules in src/ and gen_centrality.py report to one process-wide
+Instrumentation object:
+- phases: named blocks of work with their number of calls and total seconds
+  (loading the edge list, building adjacency views, BFS, dependency
+  accumulation, normalization, writing results, ...)
+- counters: running totals such as sources processed and edges relaxed
+- series: per-iteration values such as PageRank residuals
+
+Callers can register hooks that are called on every event, and a JSON
+report with all of the above plus the peak resident set size can be
+written at the end of a run
+
+Examples
+----------
+from src import instrument
+instrument.registerHook(lambda event, name, value: print(event, name, value))
+with instrument.phase("my.phase"):
+    ...
+instrument.writeReport("report.json")
+"""
+import json
+import sys
+import time
+
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is then left out of the report
+    resource = None
+
+
+class Instrumentation:
+
+    def __init__(self):
+        self.hooks = []
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all recorded phases, counters and series. Hooks stay registered
+        """
+
+        self.phases = {}
+        self.counters = {}
+        self.series = {}
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Context manager timing the enclosed block as one call of phase `name`
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            entry = self.phases.setdefault(name, {'calls': 0, 'seconds': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            self._emit("phase", name, seconds)
+
+    def count(self, name, value=1):
+        """
+        Add value to counter `name`
+        """
+
+        self.counters[name] = self.counters.get(name, 0) + value
+        self._emit("count", name, value)
+
+    def record(self, name, value):
+        """
+        Append value to series `name`
+        """
+
+        self.series.setdefault(name, []).append(value)
+        self._emit("record", name, value)
+
+    def registerHook(self, hook):
+        """
+        Call hook(event, name, value) on every event. event is "phase" (value is
+        the duration in seconds), "count" (value is the increment) or "record"
+        """
+
+        self.hooks.append(hook)
+
+    def removeHook(self, hook):
+        self.hooks.remove(hook)
+
+    def snapshot(self):
+        """
+        Phases, counters and series as plain data, e.g. to send from a worker process
+        """
+
+        return {
+            'phases': {name: dict(entry) for name, entry in self.phases.items()},
+            'counters': dict(self.counters),
+            'series': {name: list(values) for name, values in self.series.items()},
+        }
+
+    def merge(self, snapshot):
+        """
+        Add a `snapshot` taken in another process into this object
+        Hooks are not called for merged values
+        """
+
+        for name, entry in snapshot['phases'].items():
+            mine = self.phases.setdefault(name, {'calls': 0, 'seconds': 0.0})
+            mine['calls'] += entry['calls']
+            mine['seconds'] += entry['seconds']
+        for name, value in snapshot['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        for name, values in snapshot['series'].items():
+            self.series.setdefault(name, []).extend(values)
+
+    def report(self):
+        """
+        Everything recorded so far plus peak RSS in bytes, for this process and
+        for its finished child processes (e.g. pool workers)
+        """
+
+        report = self.snapshot()
+        report['peakRSS'] = _peakRSS(resource.RUSAGE_SELF) if resource else None
+        report['peakRSSChildren'] = _peakRSS(resource.RUSAGE_CHILDREN) if resource else None
+        return report
+
+    def writeReport(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def _emit(self, event, name, value):
+        for hook in self.hooks:
+            hook(event, name, value)
+
+
+def _peakRSS(who):
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+instrumentation = Instrumentation()
+
+phase = instrumentation.phase
+count = instrumentation.count
+record = instrumentation.record
+registerHook = instrumentation.registerHook
+removeHook = instrumentation.removeHook
+writeReport = instrumentation.writeReport
@@ -1,7 +1,17 @@
 import time
 
+import numpy as np
+import scipy.sparse as sp
 
-def biasedPageRank(adjGraph, preference_vector=None, alpha=0.85, max_iterations=128, tolerance=1.0e-9):
+from collections import deque
+
+from src import instrument
+from src.graph import AdjGraph, indexNodeIDs
+from src.shards import iterShard, readShardIndex
+
+
+def biasedPageRank(adjGraph, preference_vector=None, alpha=0.85, max_iterations=128, tolerance=1.0e-9,
+                   backend="dict"):
     """
     Compute the biased PageRank centrality of all nodes in the graph
     Calculate the PageRank values using the standard power-iteration method
@@ -23,6 +33,10 @@ def biasedPageRank(adjGraph, preference_vector=None, alpha=0.85, max_iterations=
     tolerance: float, default = 1.0e-9
         If difference in 2 consecutive PageRank vectors is less than n * tolerance, we assume it has converged
         Here n is the number of nodes
+
+    backend: str, default = "dict"
+        "dict" iterates over SNAP's node objects
+        "sparse" runs every iteration as a sparse matrix-vector product, see `_sparsePageRank`
     ----------
 
     Returns
@@ -48,6 +62,15 @@ def biasedPageRank(adjGraph, preference_vector=None, alpha=0.85, max_iterations=
     """
 
     start = time.time()
+
+    if backend == "sparse":
+        pageRank, convIteration = _sparsePageRank(adjGraph.csr, preference_vector, alpha,
+                                                  max_iterations, tolerance)
+        diff = time.time() - start
+        return (pageRank, convIteration, diff)
+    elif backend != "dict":
+        raise ValueError(f"Unknown backend {backend}")
+
     graph = adjGraph.SNAPGraph
     n = len(adjGraph)
 
@@ -55,7 +78,8 @@ def biasedPageRank(adjGraph, preference_vector=None, alpha=0.85, max_iterations=
 
     # If preference_vector is not None, then set values of d[u] according to the given vector
     if preference_vector:
-        s = len(preference_vector)
+        # A node listed twice is still weighted like every other preferred node
+        s = len(set(preference_vector))
         for node in preference_vector:
             d[node] = 1 / s
     else:
@@ -84,6 +108,8 @@ def biasedPageRank(adjGraph, preference_vector=None, alpha=0.85, max_iterations=
         nodeErrors = [abs(pageRank[i.GetId()] - prevIter[i.GetId()])
                       for i in graph.Nodes()]
         err = sum(nodeErrors)
+        instrument.count("pagerank.iterations")
+        instrument.record("pagerank.residual", err)
         if err < n * tolerance:
             convIteration = idx + 1
             break
@@ -91,3 +117,751 @@ def biasedPageRank(adjGraph, preference_vector=None, alpha=0.85, max_iterations=
     end = time.time()
     diff = end - start
     return (pageRank, convIteration, diff)
+
+
+def _sparsePageRank(csr, preference_vector, alpha, max_iterations, tolerance):
+    """
+    Power iteration of biased PageRank on NumPy arrays
+
+    Parameters
+    ----------
+    csr: src.graph.CSRGraph
+        Graph for which centrality needs to be computed
+
+    preference_vector, alpha, max_iterations, tolerance:
+        Same as in `biasedPageRank`
+    ----------
+
+    Returns
+    -------
+    pageRank : dict
+        Dictionary with node ID as key and PageRank centrality being value
+
+    convIteration: int
+        Iteration number when the values of PageRank converged
+    ----------
+
+    Every iteration computes x' = alpha * (P x + (sum of x over dangling nodes) * d) + (1 - alpha) * d
+    where P is the column-stochastic matrix from `transitionMatrix` and d the preference vector.
+    Rank held by dangling nodes (out-degree 0) is handed out according to d instead of being lost
+    """
+
+    with instrument.phase("pagerank.transitionMatrix"):
+        transition, dangling = transitionMatrix(csr)
+    d = preferenceArray(csr, preference_vector)
+    pageRank, convIteration = _powerIteration(transition, dangling, d, d.copy(), alpha,
+                                              max_iterations, tolerance)
+    return csr.toDict(pageRank), convIteration
+
+
+def _powerIteration(transition, dangling, d, pageRank, alpha, max_iterations, tolerance):
+    """
+    Power iteration loop of `_sparsePageRank`, starting from the array pageRank
+    Returns the final array and the iteration at which it converged
+    """
+
+    n = len(d)
+    convIteration = max_iterations
+
+    for idx in range(max_iterations):
+        nextRank = transition @ pageRank
+        nextRank += pageRank[dangling].sum() * d
+        nextRank *= alpha
+        nextRank += (1 - alpha) * d
+        nextRank /= nextRank.sum()
+
+        err = np.abs(nextRank - pageRank).sum()
+        pageRank = nextRank
+        instrument.count("pagerank.iterations")
+        instrument.record("pagerank.residual", float(err))
+        if err < n * tolerance:
+            convIteration = idx + 1
+            break
+
+    return pageRank, convIteration
+
+
+ACCELERATIONS = ("power", "gauss-seidel", "adaptive", "aitken", "quadratic")
+
+
+def acceleratedPageRank(adjGraph, preference_vector=None, alpha=0.85, max_iterations=128, tolerance=1.0e-9,
+                        method="power", extrapolateEvery=10, blockSize=None):
+    """
+    Compute biased PageRank with a strategy that needs fewer iterations than power iteration
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Graph object for which centrality needs to be computed
+
+    preference_vector, alpha, max_iterations, tolerance:
+        Same as in `biasedPageRank`
+
+    method: str, default = "power"
+        One of ACCELERATIONS
+        "power" is the iteration of `_sparsePageRank`
+        "gauss-seidel" updates blocks of nodes in turn, see `_gaussSeidelStep`
+        "adaptive" stops recomputing nodes that have converged, see `_adaptiveStep`
+        "aitken" and "quadratic" extrapolate power iterates periodically, see `_extrapolationStep`
+
+    extrapolateEvery: int, default = 10
+        Iterations between two extrapolations of "aitken" and "quadratic"
+
+    blockSize: int, default = None
+        Nodes updated together by "gauss-seidel". 1 gives the classic node by node sweep.
+        None splits the nodes into 32 blocks, whatever the size of the graph. A block as large
+        as the graph makes a sweep the same as a power iteration
+    ----------
+
+    Returns
+    -------
+    pageRank : dict
+        Dictionary with node ID as key and PageRank centrality being value
+
+    convIteration: int
+        Number of multiplications with the transition matrix (passes over the edges) until the
+        values of PageRank converged. max_iterations bounds the same number
+
+    residuals: list
+        L1 distance between consecutive iterates, for every iteration
+
+    diff: float
+       time taken to calculate PageRank for all nodes
+    ----------
+
+    All methods stop once the L1 distance between two iterates is below n * tolerance, as in
+    `biasedPageRank`. What the new iterate is depends on the method:
+    "power", "aitken" and "quadratic" compare an iterate with one power iteration from it. After
+    a kept extrapolation, the iterate is the extrapolated vector
+    "gauss-seidel" compares an iterate with one sweep from it, which has already used new values
+    "adaptive" compares an iterate with one update of the nodes that are not frozen. When that is
+    below the bound, all nodes are updated again and that distance is used instead
+    A step that needs a second pass over the edges (the full update of "adaptive", the check of an
+    extrapolation) counts it in convIteration, so the counts compare the work done
+    """
+
+    start = time.time()
+    csr = adjGraph.csr
+    n = len(csr)
+    transition, dangling = transitionMatrix(csr)
+    d = preferenceArray(csr, preference_vector)
+
+    if method == "power":
+        step = _powerStep(transition, dangling, d, alpha)
+    elif method == "gauss-seidel":
+        step = _gaussSeidelStep(transition, dangling, d, alpha, blockSize)
+    elif method == "adaptive":
+        step = _adaptiveStep(transition, dangling, d, alpha, tolerance)
+    elif method in ("aitken", "quadratic"):
+        step = _extrapolationStep(transition, dangling, d, alpha, method, extrapolateEvery)
+    else:
+        raise ValueError(f"Unknown method {method}")
+
+    pageRank = d.copy()
+    residuals = []
+    passes = 0
+    convIteration = max_iterations
+    while passes < max_iterations:
+        # nextRank is one step of the method from previous, which is pageRank unless an extrapolation moved it
+        previous, nextRank, stepPasses = step(pageRank)
+        err = float(np.abs(nextRank - previous).sum())
+        pageRank = nextRank
+        passes += stepPasses
+        residuals.append(err)
+        instrument.count("pagerank.iterations", stepPasses)
+        instrument.record("pagerank.residual", err)
+        if err < n * tolerance:
+            convIteration = passes
+            break
+
+    pageRank /= pageRank.sum()
+    diff = time.time() - start
+    return (csr.toDict(pageRank), convIteration, residuals, diff)
+
+
+def _powerStep(transition, dangling, d, alpha):
+    """
+    One iteration of `_powerIteration` as a function of the current iterate
+    """
+
+    def step(pageRank):
+        nextRank = transition @ pageRank
+        nextRank += pageRank[dangling].sum() * d
+        nextRank *= alpha
+        nextRank += (1 - alpha) * d
+        return pageRank, nextRank / nextRank.sum(), 1
+
+    return step
+
+
+def _gaussSeidelStep(transition, dangling, d, alpha, blockSize):
+    """
+    Block Gauss-Seidel sweep: nodes are updated blockSize at a time in index order, and every block
+    already uses the new values of the blocks before it. Rank flows along many edges within one
+    sweep instead of one edge per iteration. The dangling mass is taken at the start of a sweep
+    """
+
+    n = len(d)
+    blockSize = blockSize or max(1, -(-n // 32))
+    blocks = [(low, min(low + blockSize, n)) for low in range(0, n, blockSize)]
+    rows = [transition[low:high] for low, high in blocks]
+
+    def step(pageRank):
+        nextRank = pageRank.copy()
+        danglingMass = nextRank[dangling].sum()
+        for (low, high), block in zip(blocks, rows):
+            nextRank[low:high] = alpha * (block @ nextRank + danglingMass * d[low:high]) + (1 - alpha) * d[low:high]
+        return pageRank, nextRank / nextRank.sum(), 1
+
+    return step
+
+
+def _adaptiveStep(transition, dangling, d, alpha, tolerance, reslice=0.75):
+    """
+    Adaptive PageRank (Kamvar, Haveliwala and Golub, 2003): a node whose value changed by less than
+    tolerance * (1 - alpha) / alpha in two consecutive iterations is frozen, and its row is no longer
+    multiplied. Two iterations keep nodes whose value is just turning around from being frozen,
+    and nodes are only frozen once they hold some rank, since nodes far from the preferred nodes
+    receive none in the first iterations. The rows of the active nodes are sliced out again
+    whenever fewer than `reslice` of the sliced rows are still active.
+    Frozen nodes can still be moved by their neighbours, so when the active nodes look converged
+    the iteration is redone over all nodes and the nodes that moved are unfrozen. Convergence is
+    therefore always judged on a full iteration. Iterates are not normalized, which would move the
+    frozen values as well; they sum to 1 up to the freezing error
+    """
+
+    n = len(d)
+    threshold = tolerance * (1 - alpha) / alpha
+    active = np.ones(n, dtype=bool)
+    settled = np.zeros(n, dtype=bool)
+    state = {'nodes': np.arange(n), 'rows': transition}
+
+    def update(pageRank, nodes, rows):
+        values = alpha * (rows @ pageRank + pageRank[dangling].sum() * d[nodes]) + (1 - alpha) * d[nodes]
+        keep = active[nodes]
+        nodes, values = nodes[keep], values[keep]
+
+        nextRank = pageRank.copy()
+        nextRank[nodes] = values
+        small = (np.abs(values - pageRank[nodes]) < threshold) & (pageRank[nodes] > 0)
+        active[nodes[small & settled[nodes]]] = False
+        settled[nodes] = small
+        return nextRank
+
+    def step(pageRank):
+        # Whether this iteration skips any node; the update may freeze more, which only matters next time
+        partial = not active.all()
+        nextRank = update(pageRank, state['nodes'], state['rows'])
+        passes = 1
+        if partial and np.abs(nextRank - pageRank).sum() < n * tolerance:
+            active[:] = True
+            nextRank = update(pageRank, np.arange(n), transition)
+            passes = 2
+            state['nodes'] = np.arange(n)
+            state['rows'] = transition
+        instrument.record("pagerank.activeNodes", int(active.sum()))
+
+        if active.sum() < reslice * len(state['nodes']):
+            state['nodes'] = np.flatnonzero(active)
+            state['rows'] = transition[state['nodes']]
+        return pageRank, nextRank, passes
+
+    return step
+
+
+def _extrapolationStep(transition, dangling, d, alpha, kind, every, maxRatio=0.99):
+    """
+    Power iteration with periodic extrapolation (Kamvar, Haveliwala, Manning and Golub, 2003)
+    Every `every` iterations the last iterates are combined into an estimate of the limit:
+    "aitken" applies Aitken's delta squared process to every node with the last 3 iterates,
+    "quadratic" fits the last 4 iterates with a quadratic in the second eigenvalue, which
+    cancels the slowest decaying error terms. Negative values are clipped before normalizing.
+    Aitken's process assumes that a node approaches its limit geometrically from one side, so it
+    is only applied to nodes whose last two changes have the same sign and shrink by a ratio of at
+    most maxRatio; oscillating or stalled nodes keep their last value.
+    An extrapolation is a guess that can also move away from the limit, so it is only kept if one
+    iteration from it changes less than the iteration before it did. Checking costs one more pass
+    over the edges, whose result is the next iterate when the guess is kept
+    """
+
+    power = _powerStep(transition, dangling, d, alpha)
+    history = []
+    state = {'iteration': 0}
+
+    def step(pageRank):
+        _, nextRank, _ = power(pageRank)
+        history.append(nextRank)
+        del history[:-4]
+        state['iteration'] += 1
+        if state['iteration'] % every:
+            return pageRank, nextRank, 1
+
+        if kind == "aitken" and len(history) >= 3:
+            x0, x1, x2 = history[-3:]
+            change, lastChange = x1 - x0, x2 - x1
+            usable = (change * lastChange > 0) & (np.abs(lastChange) <= maxRatio * np.abs(change))
+            ratio = lastChange[usable] / change[usable]
+            guess = x2.copy()
+            guess[usable] += lastChange[usable] * ratio / (1 - ratio)
+        elif kind == "quadratic" and len(history) == 4:
+            x0, x1, x2, x3 = history
+            y = np.column_stack((x1 - x0, x2 - x0))
+            gamma1, gamma2 = -np.linalg.lstsq(y, x3 - x0, rcond=None)[0]
+            guess = (gamma1 + gamma2 + 1) * x1 + (gamma2 + 1) * x2 + x3
+        else:
+            return pageRank, nextRank, 1
+
+        np.maximum(guess, 0.0, out=guess)
+        guess /= guess.sum()
+        history.clear()
+        _, guessNext, _ = power(guess)
+        instrument.count("pagerank.extrapolations")
+        if np.abs(guessNext - guess).sum() < np.abs(nextRank - pageRank).sum():
+            instrument.count("pagerank.extrapolationsKept")
+            history.append(guessNext)
+            return guess, guessNext, 2
+        history.append(nextRank)
+        return pageRank, nextRank, 2
+
+    return step
+
+
+def transitionMatrix(csr):
+    """
+    Build the degree-normalized transition matrix of a graph once
+
+    Parameters
+    ----------
+    csr: src.graph.CSRGraph
+        Graph to build the matrix for
+    ----------
+
+    Returns
+    -------
+    transition: scipy.sparse.csr_matrix
+        n x n matrix with transition[u, v] = 1 / outdeg(v) for every edge v -> u
+        Columns of non-dangling nodes sum to 1
+
+    dangling: numpy.ndarray
+        Indices of nodes with out-degree 0
+    ----------
+    """
+
+    n = len(csr)
+    degrees = csr.degrees
+    rows = np.repeat(np.arange(n), degrees)
+    weights = 1 / degrees[rows]
+
+    # Row v of this matrix holds the out-edges of v, its transpose distributes PR(v) to them
+    adjacency = sp.csr_matrix((weights, csr.indices, csr.indptr), shape=(n, n))
+    transition = adjacency.T.tocsr()
+    dangling = np.flatnonzero(degrees == 0)
+    return transition, dangling
+
+
+def preferenceArray(csr, preference_vector=None):
+    """
+    Preference vector d as an array in CSR node order
+    Uniform over preference_vector if given, otherwise uniform over all nodes
+    """
+
+    return _preferenceArray(csr.nodeIDs, preference_vector)
+
+
+def _preferenceArray(nodeIDs, preference_vector):
+    """
+    `preferenceArray` for the sorted node IDs of a graph or shard index
+    Raises KeyError if a preferred node is not one of nodeIDs. Repeated node IDs count once
+    """
+
+    n = len(nodeIDs)
+    if preference_vector:
+        preferred = np.unique(indexNodeIDs(nodeIDs, preference_vector))
+        d = np.zeros(n)
+        d[preferred] = 1 / len(preferred)
+    else:
+        d = np.full(n, 1 / n)
+    return d
+
+
+def incrementalPageRank(adjGraph, pageRank, added=(), removed=(), preference_vector=None, alpha=0.85,
+                        max_iterations=128, tolerance=1.0e-9, method="push"):
+    """
+    Update a biased PageRank result after a batch of edge insertions and deletions
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Graph the previous result was computed on. It is left unchanged, so a graph
+        shared through `src.session.loadGraph` can be passed
+
+    pageRank: dict
+        Previous result of `biasedPageRank` (or of this function) on adjGraph
+
+    added: list
+        (source ID, destination ID) pairs inserted since pageRank was computed
+
+    removed: list
+        (source ID, destination ID) pairs deleted since pageRank was computed
+
+    preference_vector, alpha, max_iterations, tolerance:
+        Same as in `biasedPageRank`, and should match the previous run
+
+    method: str, default = "push"
+        "warm" runs power iteration on the updated graph starting from the previous result
+        "push" only propagates the residual that the changes created, see `_residualPush`
+    ----------
+
+    Returns
+    -------
+    pageRank : dict
+        Dictionary with node ID as key and updated PageRank centrality being value
+
+    convIteration: int
+        For "warm", the number of power iterations. For "push", the number of edge
+        relaxations divided by the number of edges, i.e. the equivalent number of
+        full iterations of work
+
+    diff: float
+       time taken to update the PageRank values
+
+    updatedGraph: src.graph.AdjGraph
+        New graph with the changes applied, to pass to the next update
+    ----------
+
+    Both methods stop once the L1 distance to the updated PageRank vector is below
+    n * tolerance, the same criterion `biasedPageRank` uses. Nodes created by the
+    changes start with their preference value
+    """
+
+    start = time.time()
+    updatedGraph = AdjGraph.fromCSR(adjGraph.csr.withEdges(added, removed))
+    csr = updatedGraph.csr
+    n = len(csr)
+
+    transition, dangling = transitionMatrix(csr)
+    d = preferenceArray(csr, preference_vector)
+    previous = np.array([pageRank.get(nodeID, d[i]) for i, nodeID in enumerate(csr.nodeIDs.tolist())])
+    previous /= previous.sum()
+
+    if method == "warm":
+        # Step sizes shrink by alpha per iteration, so a step of s leaves at most s * alpha / (1 - alpha) error
+        nextRank, convIteration = _powerIteration(transition, dangling, d, previous, alpha,
+                                                  max_iterations, tolerance * (1 - alpha) / alpha)
+    elif method == "push":
+        nextRank, relaxed = _residualPush(csr, transition, dangling, d, previous, alpha,
+                                          threshold=(1 - alpha) * tolerance)
+        convIteration = int(np.ceil(relaxed / max(csr.edgeCount, 1)))
+    else:
+        raise ValueError(f"Unknown method {method}")
+
+    diff = time.time() - start
+    return (csr.toDict(nextRank), convIteration, diff, updatedGraph)
+
+
+def _residualPush(csr, transition, dangling, d, pageRank, alpha, threshold):
+    """
+    First-in first-out residual propagation for x = alpha * (P x + (sum of x over dangling nodes) * d) + (1 - alpha) * d
+
+    Parameters
+    ----------
+    csr: src.graph.CSRGraph
+        Graph being ranked
+
+    transition, dangling:
+        Output of `transitionMatrix` for csr
+
+    d: numpy.ndarray
+        Preference vector
+
+    pageRank: numpy.ndarray
+        Starting estimate, usually the result before the graph changed
+
+    alpha: float
+        Damping parameter
+
+    threshold: float
+        Nodes whose absolute residual exceeds this are pushed
+    ----------
+
+    Returns
+    -------
+    pageRank: numpy.ndarray
+        Updated estimate, normalized to sum 1
+
+    relaxed: int
+        Number of edges along which residual was pushed
+    ----------
+
+    The residual r = alpha * (P x + dangling mass * d) + (1 - alpha) * d - x is computed once.
+    Pushing node u moves r[u] into x[u] and adds alpha * r[u] / outdeg(u) to the residual of
+    its out-neighbours. Since the old vector was a fixed point of the old graph, r is only
+    non-zero around changed edges and pushes stay local. Pushing stops once the L1 norm of r
+    is at most n * threshold, which bounds the L1 error by n * threshold / (1 - alpha).
+    Nodes are pushed in the order their residual first exceeded the threshold, as in the push
+    algorithm of Andersen, Chung and Lang, not largest residual first (Gauss-Southwell), which
+    would need a priority queue with a decrease-key for every relaxed edge
+    """
+
+    x = pageRank.copy()
+    residual = alpha * (transition @ x + x[dangling].sum() * d) + (1 - alpha) * d - x
+    degrees = csr.degrees
+
+    queued = np.abs(residual) > threshold
+    queue = deque(np.flatnonzero(queued).tolist())
+    relaxed = 0
+    # Stop early once the whole residual is within the error budget of n * threshold
+    residualNorm = np.abs(residual).sum()
+    budget = len(d) * threshold
+
+    while queue and residualNorm > budget:
+        u = queue.popleft()
+        queued[u] = False
+        ru = residual[u]
+        if abs(ru) <= threshold:
+            continue
+
+        x[u] += ru
+        residual[u] = 0.0
+        residualNorm -= abs(ru)
+        instrument.count("pagerank.pushes")
+        if degrees[u]:
+            neighbours = csr.neighbours(u)
+            before = np.abs(residual[neighbours]).sum()
+            residual[neighbours] += alpha * ru / degrees[u]
+            residualNorm += np.abs(residual[neighbours]).sum() - before
+            relaxed += len(neighbours)
+            candidates = neighbours[(np.abs(residual[neighbours]) > threshold) & ~queued[neighbours]]
+        else:
+            residual += alpha * ru * d
+            residualNorm = np.abs(residual).sum()
+            relaxed += len(d)
+            candidates = np.flatnonzero((np.abs(residual) > threshold) & ~queued)
+
+        queued[candidates] = True
+        queue.extend(candidates.tolist())
+
+    return x / x.sum(), relaxed
+
+
+def batchPageRank(adjGraph, seedSets, alpha=0.85, max_iterations=128, tolerance=1.0e-9):
+    """
+    Compute biased PageRank for many preference vectors at once
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Graph object for which centrality needs to be computed
+
+    seedSets: list
+        k lists of node IDs, each used as the preference_vector of one PageRank run
+
+    alpha, max_iterations, tolerance:
+        Same as in `biasedPageRank`, applied to every seed set
+    ----------
+
+    Returns
+    -------
+    pageRanks : numpy.ndarray
+        n x k array. Column j holds the PageRank values of seedSets[j], with rows in
+        the order of adjGraph.csr.nodeIDs
+
+    convIteration: int
+        Iteration at which the last seed set converged
+
+    diff: float
+       time taken to calculate PageRank for all seed sets
+    ----------
+
+    The preference vectors form an n x k matrix D, and every iteration computes
+    X' = alpha * (P X + D * diag(dangling mass of X)) + (1 - alpha) * D with one sparse-dense
+    matrix product. The graph is read once per iteration for all k seed sets instead of k times.
+    A column stops being updated once it converges, using the same criterion as `biasedPageRank`.
+    Memory is a few n x k float arrays, so very large batches can be split into several calls
+    """
+
+    start = time.time()
+    csr = adjGraph.csr
+    n = len(csr)
+    transition, dangling = transitionMatrix(csr)
+
+    d = np.column_stack([preferenceArray(csr, seeds) for seeds in seedSets])
+    pageRanks = d.copy()
+    active = np.arange(len(seedSets))
+    convIteration = max_iterations
+
+    for idx in range(max_iterations):
+        current = pageRanks[:, active]
+        preference = d[:, active]
+
+        nextRank = transition @ current
+        nextRank += preference * current[dangling].sum(axis=0)
+        nextRank *= alpha
+        nextRank += (1 - alpha) * preference
+        nextRank /= nextRank.sum(axis=0)
+
+        err = np.abs(nextRank - current).sum(axis=0)
+        pageRanks[:, active] = nextRank
+        active = active[err >= n * tolerance]
+        if not len(active):
+            convIteration = idx + 1
+            break
+
+    diff = time.time() - start
+    return (pageRanks, convIteration, diff)
+
+
+def localPageRank(adjGraph, seeds, alpha=0.85, epsilon=1.0e-6):
+    """
+    Approximate personalized PageRank of a seed set by local pushes (Andersen, Chung and Lang, 2006)
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Graph object for which centrality needs to be computed
+
+    seeds: list
+        Node IDs of the seed set, weighted uniformly as in `biasedPageRank`. Repeats count once
+
+    alpha: float, default = 0.85
+        Damping parameter, the probability of following an edge instead of jumping back to the seeds
+
+    epsilon: float, default = 1.0e-6
+        Nodes are pushed while their residual exceeds epsilon * outdeg(node)
+    ----------
+
+    Returns
+    -------
+    pageRank : dict
+        Dictionary with node ID as key and approximate PageRank value, for the nodes
+        that received any value. Absent nodes have (approximately) zero PageRank
+
+    pushes: int
+        Number of push operations performed
+    ----------
+
+    Each node keeps an estimate p and a residual r, with r starting at the preference vector.
+    Pushing u adds (1 - alpha) * r[u] to p[u] and spreads alpha * r[u] equally over its
+    out-neighbours. Every push settles at least (1 - alpha) * epsilon of residual, so the work is
+    O(1 / ((1 - alpha) * epsilon)) edge visits whatever the size of the graph, and only touched
+    nodes are stored. The estimate never exceeds the exact value, and the total shortfall over all
+    nodes is the residual left, at most epsilon * max(outdeg(v), 1) summed over the nodes v holding
+    residual. On undirected graphs PageRank is symmetric up to degrees, which gives the sharper
+    per-node bound of epsilon * deg(node) (Andersen, Chung and Lang). On directed graphs only the
+    total bound holds: one node can collect the leftover residual of many others.
+    Unlike `biasedPageRank`, the values are not renormalized
+    """
+
+    csr = adjGraph.csr
+    indptr = csr.indptr
+    # Repeated seeds count once, as in `preferenceArray`
+    seedIndices = np.unique(csr.indexArray(seeds)).tolist()
+
+    estimate = {}
+    residual = dict.fromkeys(seedIndices, 1 / len(seedIndices))
+    queue = deque(seedIndices)
+    queued = set(seedIndices)
+    pushes = 0
+
+    while queue:
+        u = queue.popleft()
+        queued.discard(u)
+        degree = int(indptr[u + 1] - indptr[u])
+        ru = residual.get(u, 0.0)
+        if ru <= epsilon * max(degree, 1):
+            continue
+
+        pushes += 1
+        estimate[u] = estimate.get(u, 0.0) + (1 - alpha) * ru
+        residual[u] = 0.0
+
+        # A dangling node sends the walk back to the seeds, like the dangling mass in `biasedPageRank`
+        targets = csr.neighbours(u).tolist() if degree else seedIndices
+        share = alpha * ru / len(targets)
+        for w in targets:
+            rw = residual.get(w, 0.0) + share
+            residual[w] = rw
+            if w not in queued and rw > epsilon * max(int(indptr[w + 1] - indptr[w]), 1):
+                queued.add(w)
+                queue.append(w)
+
+    nodeIDs = csr.nodeIDs
+    return {int(nodeIDs[u]): value for u, value in estimate.items()}, pushes
+
+
+def shardedPageRank(shardPath, preference_vector=None, alpha=0.85, max_iterations=128, tolerance=1.0e-9,
+                    blockEdges=1 << 22):
+    """
+    Compute biased PageRank of a graph stored as on-disk shards, for graphs that do not fit in memory
+
+    Parameters
+    ----------
+    shardPath: str or pathlib.Path
+        Shard directory written by `src.shards.shardEdgeList`
+
+    preference_vector, alpha, max_iterations, tolerance:
+        Same as in `biasedPageRank`
+
+    blockEdges: int, default = 2^22
+        Number of edges read from a shard at a time
+    ----------
+
+    Returns
+    -------
+    nodeIDs: numpy.ndarray
+        Sorted node IDs of the graph
+
+    pageRank : numpy.ndarray
+        PageRank value of every node in nodeIDs
+
+    convIteration: int
+        Iteration number when the values of PageRank converged
+
+    diff: float
+       time taken to calculate PageRank for all nodes
+    ----------
+
+    Same iteration as `_sparsePageRank`, but the edges are never loaded as a whole. Every iteration
+    reads all shards sequentially, blockEdges edges at a time, and adds the rank arriving over each
+    block into the nodes it points to. Since shards are sorted by destination, these writes stay
+    within one small, contiguous range of nodes. Memory holds a handful of float64 arrays of
+    length n (ranks, preferences and inverse out-degrees) plus one block of edges
+    """
+
+    start = time.time()
+    index = readShardIndex(shardPath)
+    nodeIDs = index['nodeIDs']
+    n = len(nodeIDs)
+    d = _preferenceArray(nodeIDs, preference_vector)
+
+    outDegrees = index['outDegrees']
+    inverseDegrees = np.zeros(n)
+    np.divide(1.0, outDegrees, out=inverseDegrees, where=outDegrees > 0)
+    dangling = outDegrees == 0
+
+    pageRank = d.copy()
+    convIteration = max_iterations
+    for idx in range(max_iterations):
+        shares = pageRank * inverseDegrees
+        nextRank = np.zeros(n)
+        for k in range(len(index['edgeCounts'])):
+            for targets, sources in iterShard(shardPath, k, index['indexType'], blockEdges):
+                # Sorted targets: the block only touches nodes targets[0] to targets[-1]
+                low, high = targets[0], targets[-1] + 1
+                nextRank[low:high] += np.bincount(targets - low, weights=shares[sources], minlength=high - low)
+
+        nextRank += pageRank[dangling].sum() * d
+        nextRank *= alpha
+        nextRank += (1 - alpha) * d
+        nextRank /= nextRank.sum()
+
+        err = np.abs(nextRank - pageRank).sum()
+        pageRank = nextRank
+        instrument.count("pagerank.iterations")
+        instrument.record("pagerank.residual", float(err))
+        if err < n * tolerance:
+            convIteration = idx + 1
+            break
+
+    diff = time.time() - start
+    return (nodeIDs, pageRank, convIteration, diff)
@@ -0,0 +1,135 @@
+"""
+Graph sessions: load every edge list at most once per process
+
+`loadGraph` keeps the AdjGraph of every edge list it has loaded, so the
+driver functions in gen_centrality.py and analyze_centrality.py share one
+graph instead of parsing the text and building the adjacency again each.
+
+The first load of an edge list also writes a binary snapshot next to it:
+<elist>.graph holds SNAP's own binary serialization of the graph and
+<elist>.csr is a graph file (see src.graphfile) whose header records a
+digest of the edge list and the parsing parameters. Later runs hash the
+edge list, and if the snapshot matches they memory-map the graph file and
+skip text parsing completely. The SNAP graph is only loaded if used
+"""
+import hashlib
+import os
+
+import snap
+
+from src.graph import AdjGraph
+from src.graphfile import readGraphSource, writeGraphFile
+
+_graphs = {}
+
+
+def loadGraph(elistPath, directed=False, srcColumnId=0, destColumnId=1, separator='\t', snapshot=True):
+    """
+    Return the AdjGraph of an edge list, loading it only on the first call
+
+    Parameters
+    ----------
+    elistPath: str or pathlib.Path
+        Path of the edge list
+
+    directed, srcColumnId, destColumnId, separator:
+        Same as in `src.graph.AdjGraph`
+
+    snapshot: bool, default = True
+        Read and write the binary snapshot next to the edge list
+    ----------
+
+    Returns
+    ----------
+    adjGraph: src.graph.AdjGraph
+        The same object for every call with the same arguments in this process
+    ----------
+    """
+
+    key = (os.path.abspath(elistPath), directed, srcColumnId, destColumnId, separator)
+    if key in _graphs:
+        return _graphs[key]
+
+    adjGraph = None
+    if snapshot:
+        params = f"{directed} {srcColumnId} {destColumnId} {separator!r}"
+        digest = hashlib.sha1((fileHash(elistPath) + params).encode()).hexdigest()
+        adjGraph = _readSnapshot(elistPath, digest)
+
+    if adjGraph is None:
+        adjGraph = AdjGraph(elistPath, directed=directed, srcColumnId=srcColumnId,
+                            destColumnId=destColumnId, separator=separator)
+        if snapshot:
+            _writeSnapshot(elistPath, digest, adjGraph)
+
+    _graphs[key] = adjGraph
+    return adjGraph
+
+
+def clearSessions():
+    """
+    Forget all graphs loaded in this process
+    """
+
+    _graphs.clear()
+
+
+def fileHash(path, blockSize=1 << 20):
+    """
+    SHA-1 hex digest of a file, read in blocks of blockSize bytes
+    """
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(blockSize), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshotPaths(elistPath):
+    """
+    Paths of the SNAP binary graph and of the graph file snapshotted for an edge list
+    """
+
+    elistPath = str(elistPath)
+    return elistPath + ".graph", elistPath + ".csr"
+
+
+def _readSnapshot(elistPath, digest):
+    """
+    Open the snapshot of elistPath, or return None if it is missing or stale
+    """
+
+    graphPath, csrPath = snapshotPaths(elistPath)
+    if not (os.path.exists(graphPath) and os.path.exists(csrPath)):
+        return None
+
+    try:
+        if readGraphSource(csrPath) != digest:
+            return None
+    except ValueError:
+        return None
+
+    return AdjGraph.fromBinary(csrPath, snapGraphPath=graphPath)
+
+
+def _writeSnapshot(elistPath, digest, adjGraph):
+    """
+    Write the snapshot of elistPath. Files are written under temporary names and renamed,
+    so a concurrent or interrupted run never sees a partial snapshot
+    """
+
+    graphPath, csrPath = snapshotPaths(elistPath)
+    csr = adjGraph.csr
+
+    try:
+        FOut = snap.TFOut(graphPath + ".tmp")
+        adjGraph.SNAPGraph.Save(FOut)
+        FOut.Flush()
+        del FOut
+
+        os.replace(graphPath + ".tmp", graphPath)
+        writeGraphFile(csrPath, csr, source=digest)
+    except OSError:
+        # A read-only dataset directory only costs us the snapshot
+        pass
@@ -0,0 +1,239 @@
+"""
+Edge list shards for graphs that do not fit in memory
+
+`shardEdgeList` turns a text edge list into a directory of binary shards
+without ever holding all edges in memory. Node i owns the range of indices
+[bounds[k], bounds[k + 1]) of exactly one shard k, and shard k holds every
+edge whose destination is in that range, sorted by destination. Shards are
+cut so that each holds about `shardEdges` edges, which bounds the memory
+used to sort one. `shardedPageRank` in src.pagerank streams the shards
+once per iteration and keeps only per-node arrays in memory.
+
+Directory layout
+----------------
+index.npz       nodeIDs int64[n] (sorted, index i <-> nodeIDs[i]), outDegrees
+                int64[n], bounds int64[shards + 1], edgeCounts int64[shards],
+                directed bool
+shard-<k>.bin   edgeCounts[k] records of two little-endian int32 (int64 if
+                n >= 2^31) node indices (destination, source), sorted by
+                destination and then source
+
+Undirected edges are stored in both directions and duplicate edges are
+dropped, as in `src.graph.CSRGraph.fromEdges`
+
+Shard an edge list with
+python -m src.shards <edge list> <shard directory> [separator]
+"""
+import os
+import sys
+
+import numpy as np
+
+from itertools import islice
+
+INDEX_NAME = "index.npz"
+
+
+def readEdgeChunks(elistPath, srcColumnId=0, destColumnId=1, separator='\t', chunkSize=1 << 20):
+    """
+    Stream an edge list as NumPy arrays, chunkSize lines at a time
+    Keep in step with readEdgeChunks in Assignment-1/subgraph.py, which has the same
+    signature and body
+
+    Yields
+    ----------
+    sources, targets: numpy.ndarray
+        int64 node IDs of the edges in one chunk. Lines starting with # are skipped
+    ----------
+    """
+
+    delimiter = None if separator.isspace() else separator
+    with open(elistPath) as f:
+        while True:
+            lines = list(islice(f, chunkSize))
+            if not lines:
+                return
+
+            edges = np.loadtxt(lines, dtype=np.int64, comments='#', delimiter=delimiter,
+                               usecols=(srcColumnId, destColumnId), ndmin=2)
+            if len(edges):
+                yield edges[:, 0], edges[:, 1]
+
+
+def shardEdgeList(elistPath, shardPath, directed=False, srcColumnId=0, destColumnId=1, separator='\t',
+                  shardEdges=1 << 24, chunkSize=1 << 20):
+    """
+    Split an edge list into destination-sorted binary shards
+
+    Parameters
+    ----------
+    elistPath: str or pathlib.Path
+        Edge list to shard
+
+    shardPath: str or pathlib.Path
+        Directory to write the shards to, created if needed
+
+    directed, srcColumnId, destColumnId, separator:
+        Same as in `src.graph.AdjGraph`
+
+    shardEdges: int, default = 2^24
+        Target number of edges per shard. Every shard holds at least one destination node,
+        so a node with a larger in-degree gets a larger shard of its own
+
+    chunkSize: int, default = 2^20
+        Number of lines of the edge list parsed at a time
+    ----------
+
+    Returns
+    ----------
+    index: dict
+        Contents of the index, see `readShardIndex`
+    ----------
+
+    Memory use is a few arrays of n entries plus one shard. The edge list is read twice:
+    once to collect the node IDs and once to write the edges as node indices to a temporary
+    binary file. That file is then split into one run per shard, and each run is sorted,
+    deduplicated and written out as its shard
+    """
+
+    os.makedirs(shardPath, exist_ok=True)
+
+    nodeIDs = np.empty(0, dtype=np.int64)
+    pending, pendingCount = [], 0
+    for sources, targets in readEdgeChunks(elistPath, srcColumnId, destColumnId, separator, chunkSize):
+        chunkIDs = np.unique(np.concatenate((sources, targets)))
+        pending.append(chunkIDs)
+        pendingCount += len(chunkIDs)
+        # Merge only once the pending IDs outnumber the merged ones, so nodeIDs is not sorted
+        # again for every chunk and memory stays within a few arrays of n entries
+        if pendingCount > len(nodeIDs):
+            nodeIDs = np.unique(np.concatenate([nodeIDs] + pending))
+            pending, pendingCount = [], 0
+    nodeIDs = np.unique(np.concatenate([nodeIDs] + pending))
+    n = len(nodeIDs)
+    indexType = np.dtype("<i4" if n < np.iinfo(np.int32).max else "<i8")
+
+    # Edges as (destination, source) index records, and the in-degree of every node to cut shards by
+    edgesPath = os.path.join(shardPath, "edges.tmp")
+    inDegrees = np.zeros(n, dtype=np.int64)
+    with open(edgesPath, "wb") as f:
+        for sources, targets in readEdgeChunks(elistPath, srcColumnId, destColumnId, separator, chunkSize):
+            src = np.searchsorted(nodeIDs, sources)
+            dst = np.searchsorted(nodeIDs, targets)
+            if not directed:
+                src, dst = np.concatenate((src, dst)), np.concatenate((dst, src))
+            inDegrees += np.bincount(dst, minlength=n)
+            np.column_stack((dst, src)).astype(indexType).tofile(f)
+
+    bounds = _shardBounds(inDegrees, shardEdges)
+    shardCount = len(bounds) - 1
+
+    # Split into one unsorted run per shard
+    runPaths = [os.path.join(shardPath, f"shard-{k}.tmp") for k in range(shardCount)]
+    runs = [open(path, "wb") for path in runPaths]
+    try:
+        for records in _readRecords(edgesPath, indexType, chunkSize):
+            shardOf = np.searchsorted(bounds, records[:, 0], side="right") - 1
+            order = np.argsort(shardOf, kind="stable")
+            records, shardOf = records[order], shardOf[order]
+            splits = np.searchsorted(shardOf, np.arange(shardCount + 1))
+            for k in np.flatnonzero(np.diff(splits)):
+                records[splits[k]:splits[k + 1]].tofile(runs[k])
+    finally:
+        for run in runs:
+            run.close()
+    os.remove(edgesPath)
+
+    outDegrees = np.zeros(n, dtype=np.int64)
+    edgeCounts = np.zeros(shardCount, dtype=np.int64)
+    for k, runPath in enumerate(runPaths):
+        records = np.fromfile(runPath, dtype=indexType).reshape(-1, 2)
+        order = np.lexsort((records[:, 1], records[:, 0]))
+        records = records[order]
+        if len(records):
+            keep = np.ones(len(records), dtype=bool)
+            keep[1:] = np.any(records[1:] != records[:-1], axis=1)
+            records = records[keep]
+
+        outDegrees += np.bincount(records[:, 1], minlength=n)
+        edgeCounts[k] = len(records)
+        with open(shardFilePath(shardPath, k), "wb") as f:
+            records.tofile(f)
+        os.remove(runPath)
+
+    np.savez(os.path.join(shardPath, INDEX_NAME), nodeIDs=nodeIDs, outDegrees=outDegrees, bounds=bounds,
+             edgeCounts=edgeCounts, directed=np.array(directed))
+    return readShardIndex(shardPath)
+
+
+def readShardIndex(shardPath):
+    """
+    Read the index of a shard directory
+
+    Returns
+    ----------
+    index: dict
+        'nodeIDs', 'outDegrees', 'bounds', 'edgeCounts' and 'directed' as described in the
+        module docstring, plus 'indexType', the dtype of the node indices in shard files
+    ----------
+    """
+
+    with np.load(os.path.join(shardPath, INDEX_NAME), allow_pickle=False) as saved:
+        index = {name: saved[name] for name in saved.files}
+    index['directed'] = bool(index['directed'])
+    index['indexType'] = np.dtype("<i4" if len(index['nodeIDs']) < np.iinfo(np.int32).max else "<i8")
+    return index
+
+
+def shardFilePath(shardPath, k):
+    return os.path.join(shardPath, f"shard-{k}.bin")
+
+
+def iterShard(shardPath, k, indexType, blockEdges=1 << 22):
+    """
+    Stream shard k sequentially, blockEdges edges per read
+
+    Yields
+    ----------
+    targets, sources: numpy.ndarray
+        Node indices of the edges in one block, sorted by target
+    ----------
+    """
+
+    for records in _readRecords(shardFilePath(shardPath, k), indexType, blockEdges):
+        yield records[:, 0], records[:, 1]
+
+
+def _readRecords(path, indexType, blockEdges):
+    # Each block is fetched with one large sequential read
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(2 * blockEdges * indexType.itemsize)
+            if not data:
+                return
+            yield np.frombuffer(data, dtype=indexType).reshape(-1, 2)
+
+
+def _shardBounds(inDegrees, shardEdges):
+    """
+    Cut node indices into ranges whose in-degrees add up to about shardEdges each
+    """
+
+    n = len(inDegrees)
+    cumulative = np.cumsum(inDegrees)
+    bounds = [0]
+    while bounds[-1] < n:
+        done = cumulative[bounds[-1] - 1] if bounds[-1] else 0
+        end = int(np.searchsorted(cumulative, done + shardEdges, side="right"))
+        bounds.append(min(n, max(end, bounds[-1] + 1)))
+    return np.array(bounds, dtype=np.int64)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        raise Exception("Usage: python -m src.shards <edge list> <shard directory> [separator]")
+
+    separator = sys.argv[3] if len(sys.argv) > 3 else '\t'
+    index = shardEdgeList(sys.argv[1], sys.argv[2], separator=separator)
+    print(f"Wrote {len(index['nodeIDs'])} nodes and {index['edgeCounts'].sum()} edges "
+          f"in {len(index['edgeCounts'])} shards to {sys.argv[2]}")
@@ -0,0 +1,202 @@
+"""
+Binary centrality store: the values of one centrality measure for all nodes,
+laid out on disk so that it can be memory-mapped and queried without parsing
+
+All integers are little-endian. The file is a 128 byte header, the measure's
+parameters as UTF-8 JSON and four arrays, each starting at an offset that is
+a multiple of 8
+
+Header
+------
+offset  size  field
+0       8     magic, the bytes b"CENTRSTR"
+8       4     uint32 format version, currently 1
+12      4     reserved, zero
+16      8     uint64 n, number of nodes
+24      32    ASCII name of the measure, zero padded
+56      8     uint64 offset of the parameters JSON
+64      8     uint64 size in bytes of the parameters JSON
+72      8     uint64 offset of `nodeIDs`
+80      8     uint64 offset of `scores`
+88      8     uint64 offset of `order`
+96      8     uint64 offset of `ranks`
+104     24    reserved, zero
+
+Arrays
+------
+nodeIDs   int64[n]      sorted node IDs
+scores    float64[n]    scores[i] is the value of node nodeIDs[i]
+order     int64[n]      positions into nodeIDs from the highest to the lowest
+                        score, ties broken by smaller node ID
+ranks     int64[n]      ranks[i] is the rank of node nodeIDs[i], 1 being the highest
+
+Score and rank of a node are found by binary search in nodeIDs, the top k
+nodes are the first k entries of order
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"CENTRSTR"
+VERSION = 1
+HEADER = struct.Struct("<8sI4x Q 32s QQ QQQQ 24x")
+
+
+class CentralityStore:
+
+    def __init__(self, measure, params, nodeIDs, scores, order, ranks):
+        """
+        Values of one centrality measure, usually opened with `readCentralityFile`
+
+        Parameters
+        ----------
+        measure: str
+            Name of the measure, e.g. "closeness"
+
+        params: dict
+            Parameters the values were computed with
+
+        nodeIDs, scores, order, ranks: numpy.ndarray
+            Arrays as described in the module docstring
+        ----------
+        """
+
+        self.measure = measure
+        self.params = params
+        self.nodeIDs = nodeIDs
+        self.scores = scores
+        self.order = order
+        self.ranks = ranks
+
+    @classmethod
+    def fromDict(cls, measure, values, params=None):
+        """
+        Build a store from a dictionary with node ID keys and centrality values
+        """
+
+        nodeIDs = np.fromiter(values.keys(), dtype=np.int64, count=len(values))
+        scores = np.fromiter(values.values(), dtype=np.float64, count=len(values))
+        byID = np.argsort(nodeIDs, kind="stable")
+        nodeIDs, scores = nodeIDs[byID], scores[byID]
+
+        # nodeIDs is sorted, so a stable sort on -scores breaks ties by node ID
+        order = np.argsort(-scores, kind="stable")
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(1, len(order) + 1)
+        return cls(measure, params or {}, nodeIDs, scores, order, ranks)
+
+    def __len__(self):
+        return len(self.nodeIDs)
+
+    def _position(self, nodeID):
+        i = int(np.searchsorted(self.nodeIDs, nodeID))
+        if i == len(self.nodeIDs) or self.nodeIDs[i] != nodeID:
+            raise KeyError(nodeID)
+        return i
+
+    def score(self, nodeID):
+        """
+        Centrality value of a node, in O(log n)
+        """
+
+        return float(self.scores[self._position(nodeID)])
+
+    def rank(self, nodeID):
+        """
+        Rank of a node, 1 for the node with the highest value, in O(log n)
+        """
+
+        return int(self.ranks[self._position(nodeID)])
+
+    def topK(self, k):
+        """
+        The k highest ranked nodes as a list of (node ID, value) tuples, in O(k)
+        """
+
+        top = self.order[:k]
+        return list(zip(self.nodeIDs[top].tolist(), self.scores[top].tolist()))
+
+    def toDict(self):
+        return dict(zip(self.nodeIDs.tolist(), self.scores.tolist()))
+
+    def exportText(self, path):
+        """
+        Write one line <NODE ID>\t<VALUE> per node, sorted by value in descending order
+        """
+
+        ranked = self.order
+        lines = [f"{k:<4}\t{v:.6f}\n" for k, v in zip(self.nodeIDs[ranked].tolist(), self.scores[ranked].tolist())]
+        with open(path, "w") as f:
+            f.write("".join(lines))
+
+
+def writeCentralityFile(path, store):
+    """
+    Write a CentralityStore to a binary centrality file
+    The file is written next to path and moved over it once complete, so readers never
+    see a partial file
+    """
+
+    params = json.dumps(store.params, sort_keys=True).encode("utf-8")
+    measure = store.measure.encode("ascii")
+    if len(measure) > 32:
+        raise ValueError(f"Measure name {store.measure} is longer than 32 bytes")
+
+    arrays = [np.ascontiguousarray(store.nodeIDs, dtype="<i8"), np.ascontiguousarray(store.scores, dtype="<f8"),
+              np.ascontiguousarray(store.order, dtype="<i8"), np.ascontiguousarray(store.ranks, dtype="<i8")]
+    offsets = []
+    offset = _align(HEADER.size + len(params))
+    for array in arrays:
+        offsets.append(offset)
+        offset = _align(offset + array.nbytes)
+
+    temporaryPath = str(path) + ".tmp"
+    with open(temporaryPath, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(store), measure, HEADER.size, len(params), *offsets))
+        f.write(params)
+        for array, arrayOffset in zip(arrays, offsets):
+            f.write(b"\0" * (arrayOffset - f.tell()))
+            f.write(array.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporaryPath, path)
+
+
+def readCentralityFile(path):
+    """
+    Memory-map a binary centrality file
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+        File written by `writeCentralityFile`
+    ----------
+
+    Returns
+    ----------
+    store: CentralityStore
+        Store whose arrays are read-only views into the mapped file
+    ----------
+    """
+
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a centrality file")
+
+    header = HEADER.unpack(bytes(data[:HEADER.size]))
+    magic, version, n, measure, paramsOffset, paramsSize, *offsets = header
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a centrality file")
+    if version != VERSION:
+        raise ValueError(f"{path} has unsupported centrality file version {version}")
+
+    params = json.loads(bytes(data[paramsOffset:paramsOffset + paramsSize]).decode("utf-8"))
+    nodeIDs, scores, order, ranks = [np.frombuffer(data, dtype=dtype, count=n, offset=offset)
+                                     for dtype, offset in zip(("<i8", "<f8", "<i8", "<i8"), offsets)]
+    return CentralityStore(measure.rstrip(b"\0").decode("ascii"), params, nodeIDs, scores, order, ranks)
+
+
+def _align(offset):
+    return -(-offset // 8) * 8
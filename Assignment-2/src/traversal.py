@@ -0,0 +1,436 @@
+"""
+Shared all-sources BFS engine
+
+Closeness, harmonic closeness, betweenness (of nodes and of edges),
+eccentricity and reachable-set size all come from one BFS per source node. `allSourcesTraversal` runs that
+BFS once per source and derives every requested measure from it, so asking
+for several measures costs a single traversal from each node. The csr
+backends of src.closeness and src.betweenness run on this engine as well.
+
+Sources can be split across a process pool that maps one shared read-only
+copy of the graph, and long runs can be checkpointed and resumed (see
+src.checkpoint), see `traverseSources`
+"""
+import time
+
+import numpy as np
+
+from multiprocessing import Pool, shared_memory
+
+from src import instrument
+from src.graph import CSRGraph
+from src.graphfile import readGraphFile
+
+MEASURES = ("closeness", "harmonic", "betweenness", "edgeBetweenness", "eccentricity", "reach")
+
+# Graph and scratch arrays of a pool worker, set up once per process by `_initWorker`
+_worker = {}
+
+
+def allSourcesTraversal(adjGraph, measures=MEASURES, workers=1, checkpoint=None):
+    """
+    Compute several BFS-based measures for all nodes with one BFS per node
+
+    Parameters
+    ----------
+    adjGraph: src.graph.AdjGraph
+        Graph object for which measures need to be computed
+
+    measures: tuple, default = MEASURES
+        Any of "closeness", "harmonic", "betweenness", "edgeBetweenness", "eccentricity" and "reach"
+
+    workers: int, default = 1
+        Number of processes to split source nodes across
+
+    checkpoint: src.checkpoint.Checkpoint, default = None
+        Save progress periodically and resume from an earlier interrupted run
+    ----------
+
+    Returns
+    -------
+    results: dict
+        For each requested measure, a dictionary with node ID as key and the measure as value.
+        closeness and betweenness are defined and normalized as in `closenessCentrality` and
+        `betweennessCentrality`. harmonic is the sum of 1 / distance over reachable nodes divided
+        by n - 1, eccentricity the largest distance to a reachable node and reach the number of
+        reachable nodes including the node itself. edgeBetweenness is keyed by edges instead of
+        nodes, see `src.graph.CSRGraph.edgesToDict`, and is the fraction of shortest paths through
+        an edge summed over all ordered pairs of nodes and divided by n * (n - 1)
+
+    diff: float
+       time taken to compute all measures
+    ----------
+    """
+
+    start = time.time()
+    csr = adjGraph.csr
+    totals = traverseSources(csr, np.arange(len(csr)), measures, workers=workers, checkpoint=checkpoint)
+    results = {}
+    for measure in measures:
+        values = finalizeMeasure(measure, totals, len(csr))
+        results[measure] = csr.edgesToDict(values) if measure == "edgeBetweenness" else csr.toDict(values)
+    diff = time.time() - start
+    return (results, diff)
+
+
+def finalizeMeasure(measure, totals, n):
+    """
+    Turn the raw per-node sums of `traverseSources` into the final values of a measure
+    """
+
+    with instrument.phase("traversal.normalize"):
+        return _finalize(measure, totals, n)
+
+
+def _finalize(measure, totals, n):
+    if measure == "closeness":
+        distSum = totals['distSum']
+        closeness = np.zeros(n)
+        np.divide(totals['reach'] - 1, distSum, out=closeness, where=distSum > 0)
+        return closeness
+    elif measure == "harmonic":
+        return totals['harmonic'] / (n - 1) if n > 1 else totals['harmonic']
+    elif measure == "betweenness":
+        return totals['betweenness'] * (1 / ((n - 1) * (n - 2)) if n > 2 else 1.0)
+    elif measure == "edgeBetweenness":
+        # Every ordered pair can use an edge, while node betweenness leaves out the pairs a node ends
+        return totals['edgeBetweenness'] * (1 / (n * (n - 1)) if n > 1 else 1.0)
+    elif measure in ("eccentricity", "reach"):
+        return totals[measure]
+    raise ValueError(f"Unknown measure {measure}")
+
+
+def traverseSources(csr, sources, measures, workers=1, squares=False, chunksPerWorker=4, checkpoint=None):
+    """
+    Run one BFS from each of `sources` and sum up what the requested measures need
+
+    Parameters
+    ----------
+    csr: src.graph.CSRGraph
+        Graph on which BFS is run
+
+    sources: numpy.ndarray
+        Indices of the source nodes to run from
+
+    measures: tuple
+        Measures from MEASURES to collect
+
+    workers: int, default = 1
+        Number of processes. Above 1, sources are split into workers * chunksPerWorker
+        chunks so that workers that finish early pick up more work
+
+    squares: bool, default = False
+        Also sum the squared betweenness dependencies, as needed for error estimates
+
+    chunksPerWorker: int, default = 4
+        See workers
+
+    checkpoint: src.checkpoint.Checkpoint, default = None
+        Save the sums of finished sources periodically. If the checkpoint holds an earlier,
+        interrupted run of the same computation, only the remaining sources are run
+    ----------
+
+    Returns
+    -------
+    totals: dict
+        Arrays of length n. Per-source values ("distSum", "reach", "harmonic", "eccentricity")
+        are stored at the index of their source and are 0 for nodes not in sources.
+        "betweenness" (and "betweennessSquares") hold dependencies summed over all sources.
+        "edgeBetweenness" has one entry per position in csr.indices, i.e. per directed edge
+    ----------
+
+    In parallel mode, the CSR arrays are copied once into shared memory blocks that workers map
+    instead of receiving a pickled copy of the graph, so memory does not grow with the number of
+    workers. A graph already memory-mapped from a graph file (see src.graphfile) is not copied at
+    all: workers map the same file. Chunk results are added up in chunk order, so results do not
+    depend on scheduling
+
+    With a checkpoint, the parallel mode makes chunks of at most `checkpoint.every` sources and
+    saves between chunks. A resumed run reuses the chunks of the saved run whatever the number of
+    workers, so it adds up exactly the same values in the same order as an uninterrupted run with
+    that checkpoint. (Smaller chunks than without a checkpoint can change the last bits of the sums.)
+    A serial run resumes exactly as well, but a checkpoint has to be resumed in the mode that saved it
+    """
+
+    done, totals, savedChunks = 0, None, 0
+    if checkpoint is not None:
+        key = checkpoint.runKey(csr, sources, measures, squares)
+        done, totals, savedChunks = checkpoint.resume(key)
+        if done and (savedChunks == 0) != (workers <= 1):
+            raise ValueError(f"Checkpoint {checkpoint.path} was saved by a {'serial' if savedChunks == 0 else 'parallel'}"
+                             " run and has to be resumed the same way")
+        instrument.count("traversal.resumedSources", done)
+
+    if workers <= 1 and checkpoint is None:
+        return _traverseChunk(csr, sources, measures, squares, traversalWorkspace(len(csr)))
+    elif workers <= 1:
+        if totals is None:
+            totals = _emptyTotals(csr, measures, squares)
+        _traverseChunk(csr, sources[done:], measures, squares, traversalWorkspace(len(csr)), totals,
+                       onSource=lambda finished: checkpoint.progress(done + finished, totals))
+        checkpoint.finish()
+        return totals
+
+    chunkCount = min(len(sources), workers * chunksPerWorker) or 1
+    if checkpoint is not None:
+        chunkCount = savedChunks or max(chunkCount, -(-len(sources) // checkpoint.every))
+    chunks = np.array_split(sources, chunkCount)
+    # Skip the chunks a resumed run has finished
+    chunks = chunks[int(np.searchsorted(np.cumsum([len(chunk) for chunk in chunks]), done, side="right")):]
+
+    blocks = []
+    specs = csr.path
+    try:
+        if specs is None:
+            specs = []
+            for array in (csr.indptr, csr.indices, csr.nodeIDs):
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+                specs.append((block.name, array.shape, array.dtype.str))
+
+        tasks = [(chunk, measures, squares) for chunk in chunks]
+        with Pool(workers, initializer=_initWorker, initargs=(specs, csr.is_directed)) as pool:
+            for (partial, report), chunk in zip(pool.imap(_traverseTask, tasks), chunks):
+                totals = partial if totals is None else _addTotals(totals, partial)
+                instrument.instrumentation.merge(report)
+                done += len(chunk)
+                if checkpoint is not None:
+                    checkpoint.progress(done, totals, chunkCount)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    if checkpoint is not None:
+        checkpoint.finish()
+    return totals
+
+
+def traversalWorkspace(n):
+    """
+    Arrays reused across sources to avoid reallocating them per BFS
+    """
+
+    return {
+        'distances': np.empty(n, dtype=np.int64),
+        'pathCounts': np.empty(n),
+        'delta': np.empty(n),
+        'edgesRelaxed': 0,
+    }
+
+
+def shortestPathDAG(csr, source, workspace, keepDAG=True, keepEdges=False):
+    """
+    Level-synchronous BFS over a CSR graph, expanding a whole level per NumPy call
+    This is also the forward phase of Brandes' algorithm
+
+    Parameters
+    ----------
+    csr: src.graph.CSRGraph
+        Graph on which BFS is run
+
+    source: int
+        Index (not ID) of the starting node
+
+    workspace: dict
+        Arrays from `traversalWorkspace`. Its distances array is overwritten with the distance
+        from source (-1 if unreachable), and if keepDAG its pathCounts array with the number
+        of shortest paths from source
+
+    keepDAG: bool, default = True
+        Count shortest paths and keep the shortest path DAG. Distances alone are cheaper
+
+    keepEdges: bool, default = False
+        Also keep the position in csr.indices of every DAG edge, as needed for edge betweenness
+    ----------
+
+    Returns
+    -------
+    dagLevels: list
+        dagLevels[d] is a tuple (sources, targets) of the shortest path DAG edges going
+        from distance d to distance d + 1, or (sources, targets, positions) if keepEdges.
+        Empty if keepDAG is False
+
+    levelSizes: list
+        levelSizes[d] is the number of nodes at distance d + 1
+    ----------
+
+    Path counts are summed along the DAG edges of a level with one np.add.at call
+    """
+
+    distances = workspace['distances']
+    pathCounts = workspace['pathCounts']
+
+    distances.fill(-1)
+    distances[source] = 0
+    if keepDAG:
+        pathCounts.fill(0.0)
+        pathCounts[source] = 1.0
+
+    frontier = np.array([source], dtype=np.int64)
+    dagLevels = []
+    levelSizes = []
+    level = 0
+    while True:
+        level += 1
+        if keepEdges:
+            sources, targets, positions = csr.expand(frontier, positions=True)
+        else:
+            sources, targets = csr.expand(frontier)
+        workspace['edgesRelaxed'] += len(targets)
+        frontier = np.unique(targets[distances[targets] < 0])
+        if not len(frontier):
+            break
+        distances[frontier] = level
+        levelSizes.append(len(frontier))
+
+        if keepDAG:
+            onPath = distances[targets] == level
+            sources, targets = sources[onPath], targets[onPath]
+            np.add.at(pathCounts, targets, pathCounts[sources])
+            dagLevels.append((sources, targets, positions[onPath]) if keepEdges else (sources, targets))
+
+    return dagLevels, levelSizes
+
+
+def accumulateDependencies(dagLevels, source, workspace, edgeTotals=None):
+    """
+    Backward phase of Brandes' algorithm over the output of `shortestPathDAG`
+
+    If edgeTotals is given, dagLevels has to come from `shortestPathDAG` with keepEdges, and the
+    dependency of source on every DAG edge (u, v), pathCounts[u] / pathCounts[v] * (1 + delta[v]),
+    is added to edgeTotals at the edge's position
+
+    Returns
+    -------
+    delta: numpy.ndarray
+        Dependency of source on every node, with delta[source] set to 0.
+        This is a view into workspace and is overwritten by the next call
+    ----------
+
+    Walks the DAG levels in reverse and accumulates
+    delta[u] += pathCounts[u] / pathCounts[v] * (1 + delta[v])
+    over all DAG edges (u, v) of a level with one np.add.at call
+    """
+
+    pathCounts = workspace['pathCounts']
+    delta = workspace['delta']
+    delta.fill(0.0)
+
+    for level in reversed(dagLevels):
+        sources, targets = level[0], level[1]
+        coeff = (1 + delta[targets]) / pathCounts[targets]
+        credit = pathCounts[sources] * coeff
+        np.add.at(delta, sources, credit)
+        if edgeTotals is not None:
+            # Every edge appears at most once in a level, so plain indexing adds correctly
+            edgeTotals[level[2]] += credit
+
+    delta[source] = 0.0
+    return delta
+
+
+def _traverseChunk(csr, sources, measures, squares, workspace, totals=None, onSource=None):
+    """
+    Serial core of `traverseSources`
+    Adds to `totals` if given, and calls onSource(number of sources finished) after each source
+    """
+
+    if totals is None:
+        totals = _emptyTotals(csr, measures, squares)
+    wantEdges = "edgeBetweenness" in measures
+    wantBetweenness = "betweenness" in measures or wantEdges
+
+    edgesRelaxed = workspace['edgesRelaxed']
+    for finished, s in enumerate(sources, 1):
+        with instrument.phase("traversal.bfs"):
+            dagLevels, levelSizes = shortestPathDAG(csr, s, workspace, keepDAG=wantBetweenness,
+                                                    keepEdges=wantEdges)
+        sizes = np.array(levelSizes, dtype=np.int64)
+        levels = np.arange(1, len(sizes) + 1)
+
+        if 'distSum' in totals:
+            totals['distSum'][s] = (levels * sizes).sum()
+        if 'reach' in totals:
+            totals['reach'][s] = 1 + sizes.sum()
+        if 'harmonic' in totals:
+            totals['harmonic'][s] = (sizes / levels).sum()
+        if 'eccentricity' in totals:
+            totals['eccentricity'][s] = len(sizes)
+        if wantBetweenness:
+            with instrument.phase("traversal.accumulate"):
+                delta = accumulateDependencies(dagLevels, s, workspace, totals.get('edgeBetweenness'))
+                if 'betweenness' in totals:
+                    totals['betweenness'] += delta
+                if squares:
+                    totals['betweennessSquares'] += delta * delta
+        if onSource is not None:
+            onSource(finished)
+
+    instrument.count("traversal.sources", len(sources))
+    instrument.count("traversal.edgesRelaxed", workspace['edgesRelaxed'] - edgesRelaxed)
+    return totals
+
+
+def _emptyTotals(csr, measures, squares):
+    n = len(csr)
+    wantBetweenness = "betweenness" in measures
+    totals = {}
+    if "closeness" in measures:
+        totals['distSum'] = np.zeros(n, dtype=np.int64)
+    if "closeness" in measures or "reach" in measures:
+        totals['reach'] = np.zeros(n, dtype=np.int64)
+    if "harmonic" in measures:
+        totals['harmonic'] = np.zeros(n)
+    if "eccentricity" in measures:
+        totals['eccentricity'] = np.zeros(n, dtype=np.int64)
+    if wantBetweenness:
+        totals['betweenness'] = np.zeros(n)
+        if squares:
+            totals['betweennessSquares'] = np.zeros(n)
+    if "edgeBetweenness" in measures:
+        totals['edgeBetweenness'] = np.zeros(csr.edgeCount)
+    return totals
+
+
+def _addTotals(totals, partial):
+    for key, values in partial.items():
+        totals[key] += values
+    return totals
+
+
+def _initWorker(specs, directed):
+    """
+    Pool initializer: attach to the shared CSR arrays and allocate scratch arrays once
+    `specs` is either the path of a graph file or a list of shared memory block descriptions
+    """
+
+    blocks = []
+    if isinstance(specs, str):
+        csr = readGraphFile(specs)
+    else:
+        arrays = []
+        for name, shape, dtype in specs:
+            block = shared_memory.SharedMemory(name=name)
+            blocks.append(block)
+            array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            array.flags.writeable = False
+            arrays.append(array)
+        csr = CSRGraph(*arrays, directed=directed)
+
+    _worker['blocks'] = blocks
+    _worker['csr'] = csr
+    _worker['workspace'] = traversalWorkspace(len(csr))
+
+
+def _traverseTask(task):
+    """
+    Pool task: `_traverseChunk` over one chunk of sources
+    Also returns what the chunk recorded in this worker's instrumentation, for the parent to merge
+    """
+
+    sources, measures, squares = task
+    instrument.instrumentation.reset()
+    totals = _traverseChunk(_worker['csr'], sources, measures, squares, _worker['workspace'])
+    return totals, instrument.instrumentation.snapshot()